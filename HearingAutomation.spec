@@ -22,6 +22,11 @@ a = Analysis(
         'watchdog',
         'watchdog.observers',
         'watchdog.events',
+        'lxml',
+        'lxml.etree',
+        'lxml._elementpath',
+        'PIL.Image',
+        'PIL.ImageOps',
         'asyncio',
         'typing_extensions',
     ],
@@ -3,17 +3,98 @@ CRM Automation using Playwright
 Handles login, store switching, patient search, and form filling.
 """
 import asyncio
+import atexit
+import logging
+import queue
+import sys
+import threading
 import time
 import os
 import shutil
-from typing import Optional, Dict, Any
-from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional, Dict, Any, Tuple
+from playwright.async_api import async_playwright, Page, Browser, BrowserContext, Error as PlaywrightError
 
 from src.config import FIELD_MAP, PROCESSED_FOLDER, FAILED_FOLDER
+from src.config_handler import CONFIG_DIR
 
 
 import traceback
-from datetime import datetime
+
+# Automation logs go to the console and a rotating file through a background
+# listener, so the browser loop never blocks on stdout while filling forms.
+# Records are only queued until the first browser start brings the listener up.
+AUTOMATION_LOG = os.path.join(CONFIG_DIR, 'automation.log')
+
+_log_queue = queue.SimpleQueue()
+_log_listener: Optional[QueueListener] = None
+_log_listener_lock = threading.Lock()
+
+logger = logging.getLogger("hearing.automation")
+logger.addHandler(QueueHandler(_log_queue))
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+# One line per failed upload, appended as failures happen
+FAILURE_LOG = os.path.join(CONFIG_DIR, 'upload_failures.log')
+
+
+def _start_log_listener():
+    """Start the console/file log listener once."""
+    global _log_listener
+    with _log_listener_lock:
+        if _log_listener is not None:
+            return
+        console = logging.StreamHandler(sys.stdout)
+        console.setFormatter(logging.Formatter("[%(asctime)s] [Auto] %(message)s", "%H:%M:%S"))
+        handlers = [console]
+        try:
+            os.makedirs(os.path.dirname(AUTOMATION_LOG), exist_ok=True)
+            log_file = RotatingFileHandler(AUTOMATION_LOG, maxBytes=1024 * 1024, backupCount=3, encoding="utf-8")
+            log_file.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+            handlers.append(log_file)
+        except OSError as e:
+            print(f"[Auto] Error opening log file: {e}")
+        _log_listener = QueueListener(_log_queue, *handlers)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+
+class LoginError(Exception):
+    """The CRM rejected the login; retrying with the same credentials won't help."""
+
+
+class PatientNotFoundError(Exception):
+    """The patient search found no match for the case."""
+
+
+def _build_selector(field: Dict[str, Any]) -> str:
+    """Turn a FIELD_MAP entry's selector_type/selector_value into a CSS selector."""
+    selector_type = field.get("selector_type", "")
+    selector_value = field.get("selector_value", "")
+    if selector_type == "ID":
+        return f"#{selector_value}"
+    if selector_type == "Name":
+        return f"[name='{selector_value}']"
+    if selector_type == "Class":
+        return f".{selector_value}"
+    return selector_value  # Fallback
+
+
+# FIELD_MAP is static, so selectors and match values are resolved once here
+# instead of for every field of every uploaded case:
+# (key, selector, input_type, lowercased value_match)
+FORM_FIELDS: Tuple[Tuple[str, str, str, str], ...] = tuple(
+    (
+        field["key"],
+        _build_selector(field),
+        field.get("input_type", "Text"),
+        str(field.get("value_match")).lower(),
+    )
+    for field in FIELD_MAP
+    if field.get("key") and field.get("selector_value")
+)
+
 
 class HearingAutomation:
     """Hearing assessment CRM automation using Playwright."""
@@ -26,6 +107,12 @@ class HearingAutomation:
         self.page: Optional[Page] = None
         self._playwright = None
         
+        # Login state, so one session can process several cases
+        self.logged_in = False
+        self.home_url = None
+        self.cases_attempted = 0
+        self.case_submitted = False
+        
         # [Fix for PyInstaller]
         # Allow looking for browsers in "browsers" folder next to EXE, 
         # or fallback to system default (avoiding _MEI temp dir issue)
@@ -40,9 +127,8 @@ class HearingAutomation:
 
     
     def _log(self, message: str):
-        """Print timestamped log message and call progress callback."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        print(f"[{timestamp}] [Auto] {message}")
+        """Queue timestamped log message and call progress callback."""
+        logger.info(message)
         if self.progress_callback:
             try:
                 self.progress_callback(message)
@@ -69,6 +155,7 @@ class HearingAutomation:
     
     async def start(self):
         """Start browser instance."""
+        _start_log_listener()
         self._log("Starting browser...")
         self._playwright = await async_playwright().start()
         
@@ -105,66 +192,103 @@ class HearingAutomation:
             await self._playwright.stop()
         self._log("Browser closed")
     
-    async def run_automation(self, data_payload: Dict[str, Any], xml_filepath: str, user_config: Dict[str, str]):
+    async def login(self, user_config: Dict[str, str]):
+        """Login to the CRM once; later cases reuse the session."""
+        url = user_config.get("url", "")
+        username = user_config.get("username", "")
+        password = user_config.get("password", "")
+        store_id = user_config.get("store_id", "")
+        
+        self._log("🔐 正在登入 CRM...")
+        if not await self.navigate_and_login(url, username, password, store_id):
+            raise LoginError("登入失敗")
+        self.home_url = self.page.url
+        self.logged_in = True
+    
+    async def process_case(self, data_payload: Dict[str, Any], xml_filepath: str, user_config: Optional[Dict[str, str]] = None, move_failed: bool = True):
         """
-        Main automation flow.
+        Search, fill and submit one case on an already logged-in session.
+        If the CRM session has expired and user_config is given, logs in again
+        first. With move_failed=False a failed file is left in place for the
+        caller to retry.
         """
+        self.case_submitted = False
         try:
             self._log(f"🚀 Starting automation for file: {os.path.basename(xml_filepath)}")
             
-            url = user_config.get("url", "")
-            username = user_config.get("username", "")
-            password = user_config.get("password", "")
-            store_id = user_config.get("store_id", "")
-            
-            # 1. Login
-            self._log("🔐 正在登入 CRM...")
-            if await self.navigate_and_login(url, username, password, store_id):
-                # 2. Search patient
-                patient_name = data_payload.get("Target_Patient_Name", "")
-                birth_date = data_payload.get("Patient_BirthDate", "")
-                
-                if patient_name:
-                    self._log(f"🔎 正在搜尋病患: {patient_name}...")
-                    if not await self.search_patient(patient_name, birth_date):
-                        raise Exception(f"無法找到病患: {patient_name}")
-                
-                # 3. Fill form
-                self._log("📝 正在填寫聽力報告...")
-                await self.fill_form(data_payload)
-                
-                # 4. Submit
-                self._log("🚀 正在提交表單...")
-                await self.submit_form()
+            # Return to the landing page if a previous case (finished or
+            # failed) left us elsewhere
+            if self.cases_attempted and self.home_url:
+                await self.page.goto(self.home_url, wait_until='domcontentloaded')
                 
-                # 5. Cleanup
-                self._move_file_to_processed(xml_filepath)
-                
-                self._log("✅ 自動化作業完成!")
-            else:
-                raise Exception("登入失敗")
+                # An idle session may have expired and redirected to the login form
+                if user_config and await self.page.locator('#Acct').count() > 0:
+                    self._log("🔐 CRM 登入已逾時,重新登入...")
+                    await self.login(user_config)
+            self.cases_attempted += 1
+            
+            # 1. Search patient
+            patient_name = data_payload.get("Target_Patient_Name", "")
+            birth_date = data_payload.get("Patient_BirthDate", "")
+            
+            if patient_name:
+                self._log(f"🔎 正在搜尋病患: {patient_name}...")
+                if not await self.search_patient(patient_name, birth_date):
+                    raise PatientNotFoundError(f"無法找到病患: {patient_name}")
+            
+            # 2. Fill form
+            self._log("📝 正在填寫聽力報告...")
+            await self.fill_form(data_payload)
+            
+            # 3. Submit
+            self._log("🚀 正在提交表單...")
+            self.case_submitted = True
+            await self.submit_form()
+            
+            # 4. Cleanup
+            self._move_file_to_processed(xml_filepath)
+            
+            self._log("✅ 自動化作業完成!")
                 
         except Exception as e:
             self._log(f"❌ Automation error: {e}")
             self._log(f"Traceback:\n{traceback.format_exc()}")
-            self._move_file_to_failed(xml_filepath)
+            if move_failed:
+                self._move_file_to_failed(xml_filepath)
             raise
     
+    async def run_automation(self, data_payload: Dict[str, Any], xml_filepath: str, user_config: Dict[str, str], move_failed: bool = True):
+        """
+        Main automation flow. Logs in on first use, then processes the case.
+        """
+        if not self.logged_in:
+            try:
+                await self.login(user_config)
+            except Exception as e:
+                self._log(f"❌ Automation error: {e}")
+                if move_failed:
+                    self._move_file_to_failed(xml_filepath)
+                raise
+        await self.process_case(data_payload, xml_filepath, user_config, move_failed)
+    
     async def navigate_and_login(self, url: str, username: str, password: str, store_id: str = "") -> bool:
         """Navigate to CRM and login."""
         try:
-            print(f"[Login] Navigating to {url}")
-            print(f"[Login] Debug: Username='{username}', Password='{'***' if password else 'EMPTY'}'")
+            logger.info(f"[Login] Navigating to {url}")
+            logger.debug(f"[Login] Debug: Username='{username}', Password='{'***' if password else 'EMPTY'}'")
             await self.page.goto(url, wait_until='domcontentloaded')
             
             # Capture alert messages (e.g., "帳號密碼錯誤")
             self.last_alert_message = None
             async def handle_dialog(dialog):
                 self.last_alert_message = dialog.message
-                print(f"[Login] Alert Dialog: {dialog.message}")
+                logger.info(f"[Login] Alert Dialog: {dialog.message}")
                 await dialog.accept()
 
-            self.page.on("dialog", handle_dialog)
+            # Register once; a re-login after session expiry reuses the page
+            if not getattr(self, '_dialog_hooked', False):
+                self.page.on("dialog", handle_dialog)
+                self._dialog_hooked = True
 
             # Fill login form
             await self.page.fill('#Acct', username)
@@ -172,7 +296,7 @@ class HearingAutomation:
             
             # Click login button
             await self.page.click('#Send')
-            print("[Login] Clicked login button")
+            logger.info("[Login] Clicked login button")
             
             # Wait for navigation or potential alert
             try:
@@ -182,27 +306,29 @@ class HearingAutomation:
             
             # Check if login successful (login form should be gone)
             if await self.page.locator('#Acct').count() > 0:
-                print("[Login] Failed - login form still visible")
+                logger.warning("[Login] Failed - login form still visible")
                 if self.last_alert_message:
-                    raise Exception(f"登入失敗: {self.last_alert_message}")
+                    raise LoginError(f"登入失敗: {self.last_alert_message}")
                 return False
             
-            print("[Login] Success!")
+            logger.info("[Login] Success!")
             
             # Handle store switch popup
             await self._handle_store_popup(store_id)
             
             return True
             
+        except LoginError:
+            raise
         except Exception as e:
-            print(f"[Login] Error: {e}")
+            logger.warning(f"[Login] Error: {e}")
             return False
     
     async def _handle_store_popup(self, store_id: str = ""):
         """Handle store switch popup."""
-        print(f"[Store] ========== STORE SWITCH DEBUG ==========")
-        print(f"[Store] Received store_id parameter: '{store_id}'")
-        print(f"[Store] store_id is truthy: {bool(store_id)}")
+        logger.debug(f"[Store] ========== STORE SWITCH DEBUG ==========")
+        logger.debug(f"[Store] Received store_id parameter: '{store_id}'")
+        logger.debug(f"[Store] store_id is truthy: {bool(store_id)}")
         
         try:
             # Wait for popup container
@@ -211,21 +337,21 @@ class HearingAutomation:
             
             try:
                 await self.page.wait_for_selector(popup_selector, state='visible', timeout=5000)
-                print("[Store] Popup found!")
+                logger.info("[Store] Popup found!")
                 
                 # Debug: Log current store shown in popup
                 current_store = await self.page.text_content('.store_current')
-                print(f"[Store] Currently displayed store: {current_store}")
+                logger.info(f"[Store] Currently displayed store: {current_store}")
                 
             except:
-                print("[Store] No popup found (timeout) - maybe already on correct store?")
+                logger.info("[Store] No popup found (timeout) - maybe already on correct store?")
                 return
             
             if store_id:
                 # Define selector
                 select_selector = 'select[name="StoreSId"]'
                 
-                print(f"[Store] Attempting to select store: {store_id}")
+                logger.info(f"[Store] Attempting to select store: {store_id}")
                 
                 # CRITICAL: Search for ALL inputs (including hidden) that might contain store info
                 form_debug = await self.page.evaluate(f'''() => {{
@@ -245,7 +371,7 @@ class HearingAutomation:
                     }}
                     return JSON.stringify(inputs, null, 2);
                 }}''')
-                print(f"[Store] All form inputs in popup:\\n{form_debug}")
+                logger.debug(f"[Store] All form inputs in popup:\\n{form_debug}")
                 
                 # Update the select AND any hidden inputs with name containing 'Store'
                 result = await self.page.evaluate(f'''() => {{
@@ -284,7 +410,7 @@ class HearingAutomation:
                     
                     return 'SUCCESS: select=' + (select ? select.value : 'N/A');
                 }}''')
-                print(f"[Store] JS modification result: {result}")
+                logger.debug(f"[Store] JS modification result: {result}")
                 
                 # Click switch button and wait for navigation
                 try:
@@ -302,15 +428,15 @@ class HearingAutomation:
                 except:
                     pass
             
-            print(f"[Store] Store switch completed")
+            logger.info(f"[Store] Store switch completed")
                 
         except Exception as e:
-            print(f"[Store] ❌ Error in handler: {e}")
+            logger.warning(f"[Store] ❌ Error in handler: {e}")
     
     async def search_patient(self, patient_name: str, birth_date: str, timeout: int = 30) -> bool:
         """Search for patient by name and birthday."""
         try:
-            print(f"[Search] Looking for: {patient_name}, DOB: {birth_date}")
+            logger.info(f"[Search] Looking for: {patient_name}, DOB: {birth_date}")
             
             # Click "使用姓名+生日搜尋客戶" tab with retry logic
             tab_selector = 'text=使用姓名+生日搜尋客戶'
@@ -482,35 +608,15 @@ class HearingAutomation:
         self._log(f"[Form] Filling form with {len(data)} fields")
         
         # Fill other fields from FIELD_MAP
-        for field in FIELD_MAP:
+        for key, selector, input_type, value_match in FORM_FIELDS:
             try:
-                key = field.get("key")
-                if not key or key not in data:
+                if key not in data:
                     continue
                 
                 data_value = data[key]
                 if data_value is None or data_value == "":
                     continue
                 
-                # Construct Selector
-                selector_type = field.get("selector_type", "")
-                selector_value = field.get("selector_value", "")
-                
-                if not selector_value:
-                    continue
-                    
-                selector = ""
-                if selector_type == "ID":
-                    selector = f"#{selector_value}"
-                elif selector_type == "Name":
-                    selector = f"[name='{selector_value}']"
-                elif selector_type == "Class":
-                    selector = f".{selector_value}"
-                else:
-                    selector = selector_value # Fallback
-                
-                input_type = field.get("input_type", "Text")
-                
                 # Handle different input types
                 if input_type in ["Text", "Textarea"]:
                     await self.page.fill(selector, str(data_value))
@@ -520,14 +626,8 @@ class HearingAutomation:
                     
                 elif input_type == "Radio":
                     # For radio, we check if the data_value matches the 'value_match'
-                    value_match = field.get("value_match")
-                    
-                    # specific boolean conversion for comparison
-                    str_data_val = str(data_value).lower()
-                    str_match_val = str(value_match).lower()
-                    
                     # Handle python bool string "True"/"False" vs "true"/"false"
-                    if str_data_val == str_match_val:
+                    if str(data_value).lower() == value_match:
                         await self.page.click(selector)
                         self._log(f"[Form] Clicked Radio {key}: {selector} (Match: {data_value})")
                     else:
@@ -546,7 +646,7 @@ class HearingAutomation:
                     self._log(f"[Form] Filled {key}: {data_value}")
                 
             except Exception as e:
-                self._log(f"[Form] Error filling {field.get('key', '?')}: {e}")
+                self._log(f"[Form] Error filling {key}: {e}")
         
         self._log("[Form] Form fill complete")
     
@@ -557,7 +657,7 @@ class HearingAutomation:
             # Wait for button to be clickable
             await submit_btn.wait_for(state='visible', timeout=5000)
             await submit_btn.click()
-            print("[Submit] Form submitted!")
+            logger.info("[Submit] Form submitted!")
             
             # Dynamic wait: wait for verify_res element OR alert OR navigation
             # Usually after submit, we might see a success message or be redirected
@@ -570,57 +670,154 @@ class HearingAutomation:
                 # e.g., await self.page.wait_for_selector('.success-message', timeout=3000)
                 
             except Exception as e:
-                print(f"[Submit] Wait post-submit warning (non-fatal): {e}")
+                logger.warning(f"[Submit] Wait post-submit warning (non-fatal): {e}")
                 
         except Exception as e:
-            print(f"[Submit] Error: {e}")
+            logger.warning(f"[Submit] Error: {e}")
             raise
     
     def _move_file_to_processed(self, filepath: str):
         """Move processed file to processed folder relative to source file."""
-        try:
-            source_dir = os.path.dirname(filepath)
-            processed_dir = os.path.join(source_dir, "processed")
-            
-            if not os.path.exists(processed_dir):
-                os.makedirs(processed_dir)
-            
-            filename = os.path.basename(filepath)
-            dest = os.path.join(processed_dir, filename)
-            
-            # Handle duplicate filenames
-            if os.path.exists(dest):
-                base, ext = os.path.splitext(filename)
-                timestamp = int(time.time())
-                dest = os.path.join(processed_dir, f"{base}_{timestamp}{ext}")
-            
-            shutil.move(filepath, dest)
-            print(f"[Cleanup] Moved to processed: {os.path.basename(dest)}")
-        except Exception as e:
-            print(f"[Cleanup] Error moving file: {e}")
+        self._move_file(filepath, "processed")
     
     def _move_file_to_failed(self, filepath: str):
         """Move failed file to failed folder relative to source file."""
+        self._move_file(filepath, "failed")
+    
+    def _move_file(self, filepath: str, folder: str):
+        """Move a file into a sibling folder, suffixing a timestamp on name clashes."""
         try:
-            source_dir = os.path.dirname(filepath)
-            failed_dir = os.path.join(source_dir, "failed")
-            
-            if not os.path.exists(failed_dir):
-                os.makedirs(failed_dir)
+            source_dir, filename = os.path.split(filepath)
+            target_dir = os.path.join(source_dir, folder)
+            os.makedirs(target_dir, exist_ok=True)
             
-            filename = os.path.basename(filepath)
-            dest = os.path.join(failed_dir, filename)
+            dest_name = filename
+            dest = os.path.join(target_dir, dest_name)
             
             # Handle duplicate filenames
             if os.path.exists(dest):
                 base, ext = os.path.splitext(filename)
-                timestamp = int(time.time())
-                dest = os.path.join(failed_dir, f"{base}_{timestamp}{ext}")
+                dest_name = f"{base}_{int(time.time())}{ext}"
+                dest = os.path.join(target_dir, dest_name)
             
             shutil.move(filepath, dest)
-            print(f"[Cleanup] Moved to failed: {os.path.basename(dest)}")
+            logger.info(f"[Cleanup] Moved to {folder}: {dest_name}")
         except Exception as e:
-            print(f"[Cleanup] Error moving file: {e}")
+            logger.warning(f"[Cleanup] Error moving file: {e}")
+
+
+class AutomationSession:
+    """
+    Keeps one browser and CRM login alive across uploads.
+    Browser work runs on a private event loop thread; the browser is
+    recreated after any failure or when the account/store changes.
+    """
+    
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._auto: Optional[HearingAutomation] = None
+        self._login_key = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._failure_log = None
+        self._failure_lock = threading.Lock()
+    
+    def _call(self, coro):
+        """Run a coroutine on the session loop and wait for its result."""
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="automation-loop", daemon=True)
+            self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+    
+    def run(self, data_payload: Dict[str, Any], xml_filepath: str, user_config: Dict[str, str], progress_callback=None):
+        """Process one case, logging in only when needed."""
+        try:
+            self._call(self._run(data_payload, xml_filepath, user_config, progress_callback))
+        except Exception as e:
+            self._log_failure(xml_filepath, e)
+            raise
+    
+    def _log_failure(self, xml_filepath: str, error: Exception):
+        """Append one line to FAILURE_LOG, opened once and line-buffered so it can be tailed."""
+        with self._failure_lock:
+            try:
+                if self._failure_log is None:
+                    os.makedirs(os.path.dirname(FAILURE_LOG), exist_ok=True)
+                    self._failure_log = open(FAILURE_LOG, "a", encoding="utf-8", buffering=1)
+                    self._failure_log.write(f"=== Session started {time.strftime('%Y-%m-%d %H:%M:%S')} ===\n")
+                self._failure_log.write(f"{time.strftime('%H:%M:%S')}\t{os.path.basename(xml_filepath)}\t{error}\n")
+            except OSError as e:
+                logger.warning(f"[Session] Error writing failure log: {e}")
+    
+    async def _run(self, data_payload, xml_filepath, user_config, progress_callback):
+        login_key = tuple(user_config.get(k, "") for k in ("url", "username", "password", "store_id"))
+        if self._auto is not None and login_key != self._login_key:
+            await self._discard()
+        
+        auto = self._auto
+        if auto is not None:
+            # The browser may have died while the app sat idle (an expired
+            # CRM login is handled by process_case), so a browser error here
+            # is retried once on a fresh browser before the file is moved
+            # to failed/
+            auto.progress_callback = progress_callback
+            try:
+                await auto.run_automation(data_payload, xml_filepath, user_config, move_failed=False)
+                self._login_key = login_key
+                return
+            except Exception as e:
+                # Only browser/transport errors are worth a retry. Login and
+                # patient-search failures would fail the same way again, and
+                # a submitted form must not be sent twice
+                if not isinstance(e, PlaywrightError) or auto.case_submitted:
+                    auto._move_file_to_failed(xml_filepath)
+                    await self._discard()
+                    raise
+                auto._log(f"⚠️ 瀏覽器工作階段失效,重新啟動後重試: {e}")
+                await self._discard()
+        
+        self._auto = HearingAutomation(headless=self.headless, progress_callback=progress_callback)
+        try:
+            await self._auto.start()
+        except Exception:
+            if auto is not None:
+                # The failed warm attempt left the file in place for this retry
+                self._auto._move_file_to_failed(xml_filepath)
+            await self._discard()
+            raise
+        
+        try:
+            await self._auto.run_automation(data_payload, xml_filepath, user_config)
+            self._login_key = login_key
+        except Exception:
+            # Start from a fresh browser next time
+            await self._discard()
+            raise
+    
+    async def _discard(self):
+        auto, self._auto, self._login_key = self._auto, None, None
+        if auto:
+            try:
+                await auto.close()
+            except Exception as e:
+                logger.warning(f"[Session] Error closing browser: {e}")
+    
+    def close(self):
+        """Close the browser, the failure log and stop the loop thread."""
+        with self._failure_lock:
+            if self._failure_log is not None:
+                self._failure_log.close()
+                self._failure_log = None
+        if self._loop is None:
+            return
+        try:
+            self._call(self._discard())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
 
 
 # Synchronous wrapper for backward compatibility
@@ -631,3 +828,4 @@ def run_automation_sync(data_payload: Dict[str, Any], xml_filepath: str, user_co
             await auto.run_automation(data_payload, xml_filepath, user_config)
     
     asyncio.run(_run())
+
@@ -3,6 +3,7 @@
 # ==========================================
 import sys
 import os
+from types import MappingProxyType
 
 def get_base_path():
     """Get the base path for resources."""
@@ -22,6 +23,31 @@ GOOGLE_SHEET_NAME = "Hearing_Assessment_Log"
 PROCESSED_FOLDER = "Processed"
 FAILED_FOLDER = "Failed"
 
+# ==========================================
+# STORES - CRM store switch options
+# ==========================================
+# Display name -> CRM StoreSId (read-only, shared by every UI)
+STORE_OPTIONS = MappingProxyType({
+    "不切換 (使用預設)": "",
+    "桃園藝文店": "0O146270501766340937",
+    "龜山萬壽店": "0O303359038470254289",
+    "內壢忠孝二店": "0O309358019937740140",
+    "中壢環東店": "0O311663907407279810",
+    "彰化員林大同店": "0P345691397366329983",
+    "湖口成長店": "0O312542441306802027",
+    "北屯崇德店": "0O312543766542134683",
+    "西屯福科店": "0P343591528669372377",
+    "竹北中興店": "0P343592174119614845",
+    "羅東倉前店": "0P345513608514105513",
+})
+STORE_NAMES = tuple(STORE_OPTIONS)
+
+# Fields that are the same for every uploaded report
+PAYLOAD_CONSTANTS = MappingProxyType({
+    "Speech_Left_Type": "1",
+    "Speech_Right_Type": "1",
+})
+
 # ==========================================
 # FIELD MAPPING - CRM Hearing Report Form
 # ==========================================
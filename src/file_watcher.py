@@ -2,70 +2,163 @@
 File Watcher Module
 Handles file system events for new XML files.
 """
+import os
+import sys
 import time
+import threading
+from collections import OrderedDict
 from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+from watchdog.observers.polling import PollingObserver
+
+# Default polling interval (seconds) for folders on network drives
+DEFAULT_POLL_INTERVAL = 5
+
+# Linux filesystem types that do not deliver reliable native change events
+NETWORK_FS_TYPES = {'cifs', 'smbfs', 'smb3', 'nfs', 'nfs4', 'fuse.sshfs', '9p'}
+
+
+def is_network_path(path):
+    """Return True if path lives on a network share (SMB/NFS/UNC)."""
+    path = os.path.abspath(path)
+
+    if sys.platform == 'win32':
+        if path.startswith('\\\\'):
+            return True  # UNC path
+        try:
+            import ctypes
+            DRIVE_REMOTE = 4
+            root = os.path.splitdrive(path)[0] + '\\'
+            return ctypes.windll.kernel32.GetDriveTypeW(root) == DRIVE_REMOTE
+        except Exception:
+            return False
+
+    # Find the longest mount point containing the path
+    try:
+        best_mount, best_type = '', ''
+        with open('/proc/mounts', 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3:
+                    continue
+                mount_point, fs_type = parts[1], parts[2]
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) \
+                        and len(mount_point) > len(best_mount):
+                    best_mount, best_type = mount_point, fs_type
+        return best_type in NETWORK_FS_TYPES
+    except OSError:
+        return False
+
+
+def create_observer(path, poll_interval=DEFAULT_POLL_INTERVAL):
+    """
+    Pick an observer for the folder: native events for local disks,
+    PollingObserver for network shares where native events are unreliable.
+    Returns (observer, is_polling).
+    """
+    if is_network_path(path):
+        return PollingObserver(timeout=poll_interval), True
+    return Observer(), False
+
 
 class XMLFileHandler(FileSystemEventHandler):
     """Watch for new/modified/deleted XML files."""
     
+    # Poll the file size this often until it stops changing
+    SETTLE_DELAY = 0.2
+    # Give up waiting on a file that is still growing after this long
+    SETTLE_TIMEOUT = 30.0
+    # Remember this many (path -> signature) entries
+    MAX_TRACKED = 256
+    
     def __init__(self, on_file_callback, on_delete_callback=None):
         self.on_file_callback = on_file_callback
         self.on_delete_callback = on_delete_callback
-        self.last_path = None
-        self.last_time = 0
+        # path -> (mtime_ns, size) of the last version dispatched
+        self._seen = OrderedDict()
+        # Paths waiting for their writes to settle
+        self._pending = set()
+        self._lock = threading.Lock()
     
-    def _process_file_event(self, event):
+    def dispatch(self, event):
+        """Drop directory and non-XML events before any handler runs."""
         if event.is_directory:
             return
-        
-        filename = event.src_path
+        path = getattr(event, 'dest_path', '') or event.src_path
+        if not path.lower().endswith('.xml') and not event.src_path.lower().endswith('.xml'):
+            return
+        super().dispatch(event)
+    
+    def _signature(self, filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+    
+    def _process_file_event(self, filename):
         if not filename.lower().endswith('.xml'):
             return
-            
-        current_time = time.time()
         
-        # Simple debounce (avoid duplicate events within 1.0 second)
-        if filename == self.last_path and (current_time - self.last_time) < 1.0:
-            return
-            
-        self.last_path = filename
-        self.last_time = current_time
+        # Coalesce the burst of events a single write produces
+        with self._lock:
+            if filename in self._pending:
+                return
+            self._pending.add(filename)
+        
+        timer = threading.Timer(self.SETTLE_DELAY, self._settle, args=(filename,))
+        timer.daemon = True
+        timer.start()
+    
+    def _settle(self, filename):
+        """Wait until the file stops changing, then dispatch it once."""
+        try:
+            sig = self._signature(filename)
+            deadline = time.monotonic() + self.SETTLE_TIMEOUT
+            while sig is not None and time.monotonic() < deadline:
+                time.sleep(self.SETTLE_DELAY)
+                current = self._signature(filename)
+                if current == sig:
+                    break
+                sig = current
+        finally:
+            with self._lock:
+                self._pending.discard(filename)
+        
+        if sig is None:
+            return  # File vanished while being written
+        if sig[1] == 0:
+            return  # Still empty; the write that fills it will fire again
+        
+        # Skip repeat events for the same file version
+        with self._lock:
+            if self._seen.get(filename) == sig:
+                return
+            self._seen[filename] = sig
+            self._seen.move_to_end(filename)
+            if len(self._seen) > self.MAX_TRACKED:
+                self._seen.popitem(last=False)
+        
         self.on_file_callback(filename)
 
     def on_created(self, event):
-        self._process_file_event(event)
+        self._process_file_event(event.src_path)
         
     def on_modified(self, event):
-        self._process_file_event(event)
+        self._process_file_event(event.src_path)
         
     def on_moved(self, event):
         """Handle file moved INTO the monitored folder."""
-        if event.is_directory:
-            return
-        
         # Use dest_path since that's where the file ended up
-        filename = event.dest_path
-        if not filename.lower().endswith('.xml'):
-            return
-        
-        current_time = time.time()
-        
-        # Apply same debounce logic
-        if filename == self.last_path and (current_time - self.last_time) < 1.0:
-            return
-        
-        self.last_path = filename
-        self.last_time = current_time
-        self.on_file_callback(filename)
+        self._process_file_event(event.dest_path)
     
     def on_deleted(self, event):
         """Handle file deletion."""
-        if event.is_directory:
-            return
-        
         filename = event.src_path
         if not filename.lower().endswith('.xml'):
             return
         
+        with self._lock:
+            self._seen.pop(filename, None)
         if self.on_delete_callback:
             self.on_delete_callback(filename)
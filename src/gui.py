@@ -8,13 +8,16 @@ import os
 import json
 import base64
 import threading
+import time
+import queue
+import atexit
 from typing import Optional, Dict, Any, List
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
 
-from src.parser import parse_noah_xml, get_available_sessions
-from src.automation import HearingAutomation, run_automation_sync
-from src.config import FIELD_MAP
+from src.session_cache import load_sessions, load_available_sessions
+from src.file_watcher import XMLFileHandler, create_observer, DEFAULT_POLL_INTERVAL
+from src.ui.coalesce import CoalescedCall
+from src.automation import HearingAutomation, AutomationSession
+from src.config import FIELD_MAP, STORE_OPTIONS, STORE_NAMES, PAYLOAD_CONSTANTS
 from src.sheets_writer import (
     is_sheets_available, 
     get_service_account_email, 
@@ -30,6 +33,12 @@ from src.sheets_writer import (
 CONFIG_DIR = os.path.join(os.environ.get('LOCALAPPDATA', '.'), 'HearingAutomation')
 CONFIG_FILE = os.path.join(CONFIG_DIR, 'config.json')
 
+# Parser fields hidden from the XML preview
+PREVIEW_SKIP_KEYS = frozenset(("Raw_FirstName", "Raw_LastName"))
+
+# Longest XML preview text sent to the client
+MAX_PREVIEW_CHARS = 4096
+
 
 def _encode_password(password: str) -> str:
     """Encode password with Base64."""
@@ -65,61 +74,6 @@ def save_config(config: dict):
         print(f"[Config] Error saving config: {e}")
 
 
-class XMLFileHandler(FileSystemEventHandler):
-    """Watch for new XML files."""
-    
-    def __init__(self, callback):
-        self.callback = callback
-        self.last_path = None
-        self.last_time = 0
-    
-    def _process_event(self, event):
-        if event.is_directory:
-            return
-        
-        filename = event.src_path
-        if not filename.lower().endswith('.xml'):
-            return
-            
-        import time
-        current_time = time.time()
-        
-        # Simple debounce (avoid duplicate events within 1 second)
-        if filename == self.last_path and (current_time - self.last_time) < 1.0:
-            return
-            
-        self.last_path = filename
-        self.last_time = current_time
-        self.callback(filename)
-
-    def on_created(self, event):
-        self._process_event(event)
-        
-    def on_modified(self, event):
-        self._process_event(event)
-        
-    def on_moved(self, event):
-        """Handle file moved INTO the monitored folder."""
-        if event.is_directory:
-            return
-        
-        # Use dest_path since that's where the file ended up
-        filename = event.dest_path
-        if not filename.lower().endswith('.xml'):
-            return
-        
-        import time
-        current_time = time.time()
-        
-        # Apply same debounce logic
-        if filename == self.last_path and (current_time - self.last_time) < 1.0:
-            return
-        
-        self.last_path = filename
-        self.last_time = current_time
-        self.callback(filename)
-
-
 class HearingApp:
     """Main Flet Application."""
     
@@ -132,13 +86,27 @@ class HearingApp:
         self.xml_data: Dict[str, Any] = {}
         self.monitoring = False
         self.processed_files_history = {}  # Map path -> mtime
-        self.processed_files_history = {}  # Map path -> mtime
         self.processing_lock = threading.Lock()
         
         # Queue System
         self.pending_files: List[str] = []
         self.current_file: Optional[str] = None
         
+        # Uploads go to one long-lived worker that keeps the browser logged in
+        self._auto_q = queue.Queue()
+        self._auto_session = AutomationSession(headless=True)
+        atexit.register(self._auto_session.close)
+        self._auto_worker = threading.Thread(target=self._auto_loop, daemon=True)
+        self._auto_worker.start()
+        
+        # Log timestamp text is reformatted at most once per second
+        self._log_ts_sec = None
+        self._log_ts_str = ""
+        
+        # Latest progress text, painted by a short coalescing timer
+        self._pending_progress = ""
+        self._progress_flusher = CoalescedCall(self._flush_progress, 0.05)
+        
         # Config
         loaded_config = load_config()
         self.profiles = loaded_config.get("profiles", {})
@@ -172,19 +140,7 @@ class HearingApp:
         self.config["spreadsheet_title"] = loaded_config.get("spreadsheet_title", "") # New: Spreadsheet title
         
         # Store options
-        self.store_options = {
-            "不切換 (使用預設)": "",
-            "桃園藝文店": "0O146270501766340937",
-            "龜山萬壽店": "0O303359038470254289",
-            "內壢忠孝二店": "0O309358019937740140",
-            "中壢環東店": "0O311663907407279810",
-            "彰化員林大同店": "0P345691397366329983",
-            "湖口成長店": "0O312542441306802027",
-            "北屯崇德店": "0O312543766542134683",
-            "西屯福科店": "0P343591528669372377",
-            "竹北中興店": "0P343592174119614845",
-            "羅東倉前店": "0P345513608514105513",
-        }
+        self.store_options = STORE_OPTIONS
         
         # FilePicker
         self.file_picker = ft.FilePicker(on_result=self.on_dialog_result)
@@ -707,16 +663,16 @@ class HearingApp:
         if not hasattr(self, 'account_list_container'):
             return
             
-        self.account_list_container.controls.clear()
+        rows = []
         
         if not self.profiles:
-            self.account_list_container.controls.append(
+            rows.append(
                 ft.Text("尚未儲存任何帳號", size=13, color=ft.Colors.GREY, italic=True)
             )
         else:
             for name, profile in self.profiles.items():
                 is_active = name == self.active_profile_name
-                self.account_list_container.controls.append(
+                rows.append(
                     ft.Container(
                         content=ft.Row([
                             ft.Icon(
@@ -749,17 +705,13 @@ class HearingApp:
                     )
                 )
         
+        # Replace all rows at once and only redraw the list
+        self.account_list_container.controls = rows
         try:
-            self.page.update()
+            self.account_list_container.update()
         except:
             pass
     
-    def _edit_account(self, profile_name):
-        """Load account into edit fields."""
-        self._fill_profile_fields(profile_name)
-        self.page.update()
-        self.page.open(ft.SnackBar(ft.Text(f"正在編輯: {profile_name}")))
-    
     def _delete_account(self, profile_name):
         """Delete an account with confirmation."""
         def confirm_delete(e):
@@ -1029,7 +981,7 @@ class HearingApp:
         items = []
         current_store = self.config.get("store_id", "")
         
-        for store_name in self.store_options.keys():
+        for store_name in STORE_NAMES:
             is_current = store_name == current_store
             items.append(
                 ft.PopupMenuItem(
@@ -1246,14 +1198,21 @@ class HearingApp:
     
     def log(self, message: str):
         """Add message to log."""
-        import time
-        timestamp = time.strftime("%H:%M:%S")
+        timestamp = self._log_timestamp()
         self.log_list.controls.append(
             ft.Text(f"[{timestamp}] {message}", size=12)
         )
         print(f"[GUI Log] {message}")  # Debug print
         self.page.update()
     
+    def _log_timestamp(self) -> str:
+        """Current time as HH:MM:SS, reformatted at most once per second."""
+        now = int(time.time())
+        if now != self._log_ts_sec:
+            self._log_ts_sec = now
+            self._log_ts_str = time.strftime("%H:%M:%S", time.localtime(now))
+        return self._log_ts_str
+    
     async def pick_folder(self, e):
         """Open folder picker dialog."""
         # Use FilePicker instead of page.get_directory_path_async
@@ -1307,14 +1266,18 @@ class HearingApp:
             self._update_status("監控中")
             
             handler = XMLFileHandler(self._safe_on_new_file)
-            self.observer = Observer()
+            self.observer, is_polling = create_observer(self.watch_path)
             self.observer.schedule(handler, self.watch_path, recursive=False)
             self.observer.start()
             
-            # Start polling thread as backup
-            threading.Thread(target=self._polling_loop, daemon=True).start()
+            # Native events can be missed, so poll as a backup; a polling
+            # observer (network drives) already is one
+            if not is_polling:
+                threading.Thread(target=self._polling_loop, daemon=True).start()
             
             self.log(f"🟢 開始監控: {self.watch_path}")
+            if is_polling:
+                self.log(f"🌐 網路磁碟，改用輪詢模式 (每 {DEFAULT_POLL_INTERVAL} 秒)")
             
             # Initial scan
             self.page.run_task(self._initial_scan)
@@ -1329,13 +1292,15 @@ class HearingApp:
     async def _initial_scan(self):
         """Perform initial scan for files."""
         try:
-            xml_files = [
-                os.path.join(self.watch_path, f) 
-                for f in os.listdir(self.watch_path) 
-                if f.lower().endswith('.xml')
-            ]
-            if xml_files:
-                latest_file = max(xml_files, key=os.path.getmtime)
+            # Stream the directory; only the newest entry is kept
+            with os.scandir(self.watch_path) as it:
+                latest = max(
+                    (e for e in it if e.name.lower().endswith('.xml') and e.is_file()),
+                    key=lambda e: e.stat().st_mtime,
+                    default=None,
+                )
+            if latest is not None:
+                latest_file = latest.path
                 self.log(f"🔎 發現既有檔案: {os.path.basename(latest_file)}")
                 self._safe_on_new_file(latest_file)
         except Exception as e:
@@ -1347,15 +1312,16 @@ class HearingApp:
         while self.monitoring:
             try:
                 if self.watch_path and os.path.exists(self.watch_path):
-                    files = [f for f in os.listdir(self.watch_path) if f.lower().endswith('.xml')]
+                    # One directory pass instead of a stat per file
+                    with os.scandir(self.watch_path) as it:
+                        present = {e.path: e.stat().st_mtime for e in it
+                                   if e.name.lower().endswith('.xml') and e.is_file()}
                     
-                    # 1. Check existing files
-                    for f in files:
-                        filepath = os.path.join(self.watch_path, f)
+                    # 1. Check existing files (mtime comes from the scan, no extra stat)
+                    for filepath, mtime in present.items():
                         try:
                             # Just call the safe handler, it will deduplicate
-                            if os.path.isfile(filepath):
-                                self._safe_on_new_file(filepath)
+                            self._safe_on_new_file(filepath, mtime)
                         except:
                             pass
                     
@@ -1363,7 +1329,7 @@ class HearingApp:
                     with self.processing_lock:
                         # Create list of keys to safely modify dict during iteration
                         for path in list(self.processed_files_history.keys()):
-                            if not os.path.exists(path):
+                            if path not in present:
                                 del self.processed_files_history[path]
                                 # print(f"[DEBUG] Cleared history for missing file: {path}")
 
@@ -1371,14 +1337,15 @@ class HearingApp:
             except:
                 time.sleep(2)
 
-    def _safe_on_new_file(self, filepath: str):
+    def _safe_on_new_file(self, filepath: str, current_mtime: Optional[float] = None):
         """Thread-safe file handler with deduplication logic."""
         
         with self.processing_lock:
-            try:
-                current_mtime = os.path.getmtime(filepath)
-            except OSError:
-                return  # File might be gone/locked
+            if current_mtime is None:
+                try:
+                    current_mtime = os.path.getmtime(filepath)
+                except OSError:
+                    return  # File might be gone/locked
             
             # Check if already in pending or currently being processed
             in_pending = filepath in self.pending_files
@@ -1406,30 +1373,27 @@ class HearingApp:
             self.update_pending_list()
             
             # Auto-restore window on new file
-            # Auto-restore window on new file
-            try:
-                self.page.window.minimized = False
-                self.page.window.always_on_top = True
-                self.page.update()
-                
-                # Small delay then release always_on_top
-                import time
-                # time.sleep(0.1) # Cannot block here? running in thread?
-                # _safe_on_new_file is called from thread, so sleep is OK but might delay main thread if using page.update?
-                # Actually page.update is thread-safe in Flet.
-                
-                # To be safe, just keep it on top for a moment or rely on user interaction?
-                # Let's toggle it off in a scheduled task if possible, but simplest is:
-                self.page.window.to_front()
-                self.page.window.always_on_top = False
-                self.page.update()
-            except:
-                pass
+            self._bring_to_front()
 
         # Auto-process if idle
         if not self.current_file:
              self.page.run_task(self._load_file, filepath)
     
+    def _bring_to_front(self):
+        """Restore and raise the window, unless it is already the focused window."""
+        try:
+            window = self.page.window
+            if window.focused and not window.minimized:
+                return
+            window.minimized = False
+            window.always_on_top = True
+            self.page.update()
+            window.to_front()
+            window.always_on_top = False
+            self.page.update()
+        except Exception:
+            pass
+    
     def update_pending_list(self):
         """Update the UI list of pending files."""
         items = []
@@ -1466,8 +1430,10 @@ class HearingApp:
                     ink=True,
                 )
             )
+        # Swap the whole list in one go and only redraw the list itself
         self.pending_list_view.controls = items
-        self.page.update()
+        if self.pending_list_view.page:
+            self.pending_list_view.update()
 
     def select_pending_file(self, filepath):
         """Manually select a file from queue to process."""
@@ -1504,10 +1470,14 @@ class HearingApp:
         print(f"[DEBUG] _load_file: Start loading {filepath}")
         self.current_file = filepath 
         self.detected_file = filepath
-        self.log(f"📄 載入檔案: {os.path.basename(filepath)}")
+        filename = os.path.basename(filepath)
+        self.log(f"📄 載入檔案: {filename}")
         
         try:
-            sessions = parse_noah_xml(filepath)
+            # Parse off the event loop so the window stays responsive on large files
+            sessions = await asyncio.to_thread(load_sessions, filepath)
+            if filepath != self.detected_file:
+                return  # Another file was selected while this one was parsing
             print(f"[DEBUG] Parse result sessions count: {len(sessions) if sessions else 0}")
             if sessions:
                 self.xml_data = sessions[0]
@@ -1515,28 +1485,28 @@ class HearingApp:
                 birth_date = self.xml_data.get("Patient_BirthDate", "")
                 
                 self.patient_name.value = f"👤 {patient_name}"
-                self.patient_info.value = f"生日: {birth_date} | 檔案: {os.path.basename(filepath)}"
+                self.patient_info.value = f"生日: {birth_date} | 檔案: {filename}"
                 self.process_btn.disabled = False
                 
                 # Update preview
-                preview = "\n".join([f"{k}: {v}" for k, v in self.xml_data.items() 
-                                    if v and k not in ["Raw_FirstName", "Raw_LastName"]])
+                preview = "\n".join(f"{k}: {v}" for k, v in self.xml_data.items()
+                                    if v and k not in PREVIEW_SKIP_KEYS)
+                if len(preview) > MAX_PREVIEW_CHARS:
+                    # Cut at a line boundary so no field is shown half-written
+                    cut = preview.rfind("\n", 0, MAX_PREVIEW_CHARS)
+                    preview = preview[:cut if cut > 0 else MAX_PREVIEW_CHARS] + "\n… (已截斷)"
                 self.xml_preview.value = preview
                 
                 self.log(f"✅ 解析成功: {patient_name}")
                 
                 # Restore window and bring to front
-                self.page.window_minimized = False
-                self.page.window_always_on_top = True
-                self.page.update()
-                import time
-                time.sleep(0.1)
-                self.page.window_always_on_top = False
-                self.page.update()
+                self._bring_to_front()
             else:
                 self.patient_name.value = "⚠️ 無法解析檔案"
                 
         except Exception as e:
+            if filepath != self.detected_file:
+                return
             self.log(f"❌ 解析錯誤: {e}")
             self.patient_name.value = "❌ 解析錯誤"
         
@@ -1567,7 +1537,7 @@ class HearingApp:
             return
         
         try:
-            session_info = get_available_sessions(self.detected_file)
+            session_info = load_available_sessions(self.detected_file)
         except Exception as ex:
             self.page.open(ft.SnackBar(ft.Text(f"錯誤: {ex}")))
             return
@@ -1602,8 +1572,8 @@ class HearingApp:
         
         self.log(f"🏪 店別: {store_display_name} (ID: {store_actual_id})")
         
-        # Build payload from XML data + wizard result
-        sessions = parse_noah_xml(self.detected_file)
+        # Build payload from XML data + wizard result (cached since _load_file)
+        sessions = load_sessions(self.detected_file)
         selected_data = self._merge_session_data(sessions, result)
         
         # Run automation in background thread
@@ -1633,41 +1603,47 @@ class HearingApp:
         self.page.open(self.progress_dialog)
         self.page.update()
         
-        # 2. Define Callback
-        def progress_callback(msg):
-            self.page.run_task(self._update_progress_ui, msg)
+        # 2. Progress messages arrive from the automation thread
+        progress_callback = self._update_progress_ui
 
-        threading.Thread(
-            target=self._run_automation,
-            args=(selected_data, self.detected_file, config, result, progress_callback)
-        ).start()
+        self._auto_q.put((selected_data, self.detected_file, config, result, progress_callback))
 
     def _update_progress_ui(self, msg):
-        """Update progress dialog text."""
-        self.progress_text.value = str(msg)
-        self.page.update()
+        """Queue a progress message; bursts are painted at most every 50ms."""
+        self._pending_progress = str(msg)
+        self._progress_flusher.request(self.page)
+    
+    def _flush_progress(self):
+        """Show the most recent queued progress message."""
+        self.progress_text.value = self._pending_progress
+        if self.progress_text.page:
+            self.progress_text.update()
     
     def _merge_session_data(self, sessions: List[Dict], result: Dict) -> Dict:
         """Merge selected session data with wizard results."""
         pta_date = result["pta_selection"].split()[0] if result["pta_selection"] else None
         tymp_date = result["tymp_selection"].split()[0] if result["tymp_selection"] else None
         
+        # Group sessions by test day once; several sessions can share a day
+        by_date = {}
+        for session in sessions:
+            by_date.setdefault(session.get("FullTestDate", "").split("T", 1)[0], []).append(session)
+        
         selected_data = {}
         
-        for session in sessions:
-            full_date = session.get("FullTestDate", "").split("T")[0]
-            
-            if pta_date and full_date == pta_date:
-                for key, value in session.items():
-                    if key.startswith("PTA_") or key.startswith("Speech_") or key.startswith("Test"):
-                        selected_data[key] = value
-                # Also add FullTestDate for Google Sheets C column
-                selected_data["FullTestDate"] = session.get("FullTestDate", "")
-            
-            if tymp_date and full_date == tymp_date:
-                for key, value in session.items():
-                    if key.startswith("Tymp_"):
-                        selected_data[key] = value
+        for session in by_date.get(pta_date, ()):
+            selected_data.update(
+                (key, value) for key, value in session.items()
+                if key.startswith(("PTA_", "Speech_", "Test"))
+            )
+            # Also add FullTestDate for Google Sheets C column
+            selected_data["FullTestDate"] = session.get("FullTestDate", "")
+        
+        for session in by_date.get(tymp_date, ()):
+            selected_data.update(
+                (key, value) for key, value in session.items()
+                if key.startswith("Tymp_")
+            )
         
         # Add patient info
         if sessions:
@@ -1675,13 +1651,15 @@ class HearingApp:
             selected_data["Patient_BirthDate"] = sessions[0].get("Patient_BirthDate", "")
         
         # Add wizard results
-        selected_data["InspectorName"] = result["inspector_name"]
-        selected_data["Otoscopy_Left_Clean"] = result["otoscopy"]["left_clean"]
-        selected_data["Otoscopy_Left_Intact"] = result["otoscopy"]["left_intact"]
-        selected_data["Otoscopy_Right_Clean"] = result["otoscopy"]["right_clean"]
-        selected_data["Otoscopy_Right_Intact"] = result["otoscopy"]["right_intact"]
-        selected_data["Speech_Left_Type"] = "1"
-        selected_data["Speech_Right_Type"] = "1"
+        otoscopy = result["otoscopy"]
+        selected_data.update({
+            "InspectorName": result["inspector_name"],
+            "Otoscopy_Left_Clean": otoscopy["left_clean"],
+            "Otoscopy_Left_Intact": otoscopy["left_intact"],
+            "Otoscopy_Right_Clean": otoscopy["right_clean"],
+            "Otoscopy_Right_Intact": otoscopy["right_intact"],
+        })
+        selected_data.update(PAYLOAD_CONSTANTS)
         
         return selected_data
     
@@ -1696,10 +1674,16 @@ class HearingApp:
         except (ValueError, TypeError):
             return None
     
+    def _auto_loop(self):
+        """Process queued uploads one at a time on the warm browser session."""
+        while True:
+            job = self._auto_q.get()
+            self._run_automation(*job)
+    
     def _run_automation(self, payload: Dict, filepath: str, config: Dict, wizard_result: Dict, progress_callback=None):
         """Run automation in background thread."""
         try:
-            run_automation_sync(payload, filepath, config, headless=True, progress_callback=progress_callback)
+            self._auto_session.run(payload, filepath, config, progress_callback=progress_callback)
             # Pass wizard_result and payload for sheets writing
             self.page.run_task(self._on_automation_success, filepath, wizard_result, payload)
         except Exception as e:
@@ -1775,18 +1759,7 @@ class HearingApp:
         
         # Clear processing history - both exact path AND any path with same basename
         if target:
-            with self.processing_lock:
-                target_basename = os.path.basename(target)
-                # Remove exact match
-                if target in self.processed_files_history:
-                    del self.processed_files_history[target]
-                # Also remove any entries with same filename
-                keys_to_remove = [
-                    path for path in self.processed_files_history 
-                    if os.path.basename(path) == target_basename
-                ]
-                for key in keys_to_remove:
-                    del self.processed_files_history[key]
+            self._forget_processed(target)
         
         if target and target in self.pending_files:
             self.pending_files.remove(target)
@@ -1795,6 +1768,22 @@ class HearingApp:
         self.page.open(ft.SnackBar(ft.Text("✅ 處理完成!")))
         self._reset_dashboard()
     
+    def _forget_processed(self, target: str) -> int:
+        """
+        Drop target, and any other path with the same file name, from the
+        processed history so the file is detected again if it comes back.
+        Returns the number of entries removed.
+        """
+        target_basename = os.path.basename(target)
+        with self.processing_lock:
+            keys_to_remove = [
+                path for path in self.processed_files_history
+                if path == target or os.path.basename(path) == target_basename
+            ]
+            for key in keys_to_remove:
+                del self.processed_files_history[key]
+        return len(keys_to_remove)
+    
     async def _on_automation_error(self, error: str, filepath: str = None):
         """Handle automation error."""
         if hasattr(self, 'progress_dialog'):
@@ -1807,19 +1796,8 @@ class HearingApp:
         # CRITICAL: Clear from processed history - both exact path AND any path with same basename
         # This ensures re-detection even if file is moved back with different path
         if target:
-            with self.processing_lock:
-                target_basename = os.path.basename(target)
-                # Remove exact match
-                if target in self.processed_files_history:
-                    del self.processed_files_history[target]
-                # Also remove any entries with same filename
-                keys_to_remove = [
-                    path for path in self.processed_files_history 
-                    if os.path.basename(path) == target_basename
-                ]
-                for key in keys_to_remove:
-                    del self.processed_files_history[key]
-                print(f"[DEBUG] Cleared {len(keys_to_remove) + 1} entries from processed history for re-detection")
+            removed = self._forget_processed(target)
+            print(f"[DEBUG] Cleared {removed} entries from processed history for re-detection")
         
         if target and target in self.pending_files:
             self.pending_files.remove(target)
@@ -4,25 +4,145 @@ Based on noah_xml_parsing_guide.md
 Parses hearing assessment XML files exported from NOAH system.
 """
 
-import xml.etree.ElementTree as ET
 from datetime import datetime
+import functools
+import logging
+from operator import itemgetter
+import os
 import re
+import threading
 from typing import Optional, Dict, List, Any
 
+try:
+    from lxml import etree as ET
+    LXML_AVAILABLE = True
+except ImportError:
+    import xml.etree.ElementTree as ET
+    LXML_AVAILABLE = False
+
+logger = logging.getLogger("hearing.parser")
+
+# lxml parser objects must not be shared between threads
+_parser_local = threading.local()
+
+# clean_xml patterns, compiled once
+_NS_PREFIX_RE = re.compile(r'(</?)[a-zA-Z0-9]+:(?=[a-zA-Z0-9_\-])')
+_XMLNS_RE = re.compile(r'\sxmlns[^"]+\"[^"]+\"')
+
+_DIGIT_RE = re.compile(r'\d+')
+
+# Tone and UCL blocks may give the ear as a code instead of a name
+_SIDE_CODES = {'1': "Right", '2': "Left"}
+
 
 def clean_xml(xml_string: str) -> str:
     """
     Remove namespace prefixes and xmlns declarations from XML.
     This simplifies ElementTree parsing significantly.
     """
-    # Remove namespace prefixes: <pt:Patient> → <Patient>
-    xml_string = re.sub(r'<[a-zA-Z0-9]+:([a-zA-Z0-9_\-]+)', r'<\1', xml_string)
-    # Remove closing namespace prefixes: </pt:Patient> → </Patient>
-    xml_string = re.sub(r'</[a-zA-Z0-9]+:([a-zA-Z0-9_\-]+)>', r'</\1>', xml_string)
-    # Remove xmlns declarations
-    xml_string = re.sub(r'\sxmlns[^"]+\"[^"]+\"', '', xml_string)
-    xml_string = re.sub(r'\sxmlns:([a-zA-Z0-9]+)=\"[^\"]+\"', '', xml_string)
-    return xml_string
+    # Remove namespace prefixes: <pt:Patient> → <Patient>, </pt:Patient> → </Patient>
+    xml_string = _NS_PREFIX_RE.sub(r'\1', xml_string)
+    # Remove xmlns declarations (both xmlns="..." and xmlns:pt="...")
+    return _XMLNS_RE.sub('', xml_string)
+
+
+def _lxml_parser():
+    """Per-thread lxml parser for NOAH exports."""
+    parser = getattr(_parser_local, 'parser', None)
+    if parser is None:
+        # Exports are read as UTF-8 whatever they declare;
+        # drop comments/PIs so child iteration matches ElementTree
+        parser = ET.XMLParser(encoding='utf-8', remove_comments=True, remove_pis=True,
+                              resolve_entities=False, huge_tree=True)
+        _parser_local.parser = parser
+    return parser
+
+
+def parse_xml_string(xml_string: str):
+    """Parse cleaned XML text into a root element (lxml when installed)."""
+    if not LXML_AVAILABLE:
+        return ET.fromstring(xml_string)
+    return ET.fromstring(xml_string.encode('utf-8'), _lxml_parser())
+
+
+def load_root(filepath: str):
+    """
+    Read a NOAH export and return its root element with all namespaces
+    removed, so lookups can use plain tag names.
+
+    The tree is shared by get_available_sessions and parse_noah_xml, which
+    the wizard runs back to back on the same file, and is reloaded once the
+    file's mtime or size changes. Callers must not modify it.
+    """
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return _read_root(filepath)
+    return _load_root_cached(filepath, st.st_mtime_ns, st.st_size)
+
+
+def _read_cleaned_root(filepath: str):
+    """Parse the file after stripping namespaces from the text with clean_xml."""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return parse_xml_string(clean_xml(f.read()))
+
+
+@functools.lru_cache(maxsize=8)
+def _load_root_cached(filepath: str, mtime_ns: int, size: int):
+    """Memoised on (path, mtime, size) so an edited file is reloaded."""
+    return _read_root(filepath)
+
+
+def _read_root(filepath: str):
+    if not LXML_AVAILABLE:
+        return _read_cleaned_root(filepath)
+    
+    # lxml resolves the prefixes itself, so instead of the clean_xml regex
+    # passes over the whole text only the element tags are rewritten
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    try:
+        root = ET.fromstring(data, _lxml_parser())
+    except ET.XMLSyntaxError:
+        # e.g. an undeclared namespace prefix, which clean_xml strips anyway
+        return _read_cleaned_root(filepath)
+    for elem in root.iter(ET.Element):
+        tag = elem.tag
+        if tag[0] == '{':
+            elem.tag = tag[tag.index('}') + 1:]
+    return root
+
+
+def _compiled_paths() -> Dict[str, Any]:
+    """Per-thread cache of compiled path lookups (lxml XPath objects are not shared)."""
+    cache = getattr(_parser_local, 'paths', None)
+    if cache is None:
+        cache = _parser_local.paths = {}
+    return cache
+
+
+def find_all(elem, path: str) -> list:
+    """elem.findall(path), using a compiled XPath under lxml."""
+    if not LXML_AVAILABLE:
+        return elem.findall(path)
+    cache = _compiled_paths()
+    xpath = cache.get(path)
+    if xpath is None:
+        xpath = cache[path] = ET.XPath(path)
+    return xpath(elem)
+
+
+def find_first(elem, path: str):
+    """elem.find(path), using a compiled XPath under lxml."""
+    if not LXML_AVAILABLE:
+        return elem.find(path)
+    key = ('first', path)
+    cache = _compiled_paths()
+    xpath = cache.get(key)
+    if xpath is None:
+        xpath = cache[key] = ET.XPath(f'({path})[1]')
+    found = xpath(elem)
+    return found[0] if found else None
 
 
 def smart_clean_name(raw_first_name: str, raw_last_name: str) -> str:
@@ -34,7 +154,7 @@ def smart_clean_name(raw_first_name: str, raw_last_name: str) -> str:
     def remove_digits(text):
         if not text:
             return ""
-        return re.sub(r'\d+', '', text).strip()
+        return _DIGIT_RE.sub('', text).strip()
     
     clean_last_name = remove_digits(raw_last_name)
     clean_first_name = remove_digits(raw_first_name)
@@ -46,10 +166,52 @@ def smart_clean_name(raw_first_name: str, raw_last_name: str) -> str:
 
 def get_text(parent: ET.Element, tag: str) -> Optional[str]:
     """Get text content of a child tag (recursive search)"""
-    node = parent.find(f'.//{tag}')
+    node = find_first(parent, f'.//{tag}')
     return node.text if node is not None else None
 
 
+def index_tags(elem) -> Dict[Any, list]:
+    """
+    Map each tag to its descendants of elem (document order), built in one
+    walk so repeated './/Tag' lookups under the same element are dict hits.
+    """
+    index: Dict[Any, list] = {}
+    it = elem.iter()
+    next(it)  # skip elem itself, like './/Tag'
+    for child in it:
+        index.setdefault(child.tag, []).append(child)
+    return index
+
+
+def index_text(index: Dict[Any, list], tag: str) -> Optional[str]:
+    """get_text() for an index built by index_tags()"""
+    nodes = index.get(tag)
+    return nodes[0].text if nodes else None
+
+
+@functools.lru_cache(maxsize=64)
+def signal_output_info(output: str) -> tuple:
+    """
+    Return (side, conduction) for a StimulusSignalOutput value such as
+    'AirConductorRight': side is 'Right', 'Left' or None, conduction is
+    'Bone' or 'Air'. Files only use a handful of values, so each is
+    classified once.
+    """
+    output_lower = output.lower()
+    side = "Right" if 'right' in output_lower else "Left" if 'left' in output_lower else None
+    return side, "Bone" if 'bone' in output_lower else "Air"
+
+
+@functools.lru_cache(maxsize=256)
+def pta_key(side: str, kind: str, freq: float) -> str:
+    """
+    Session key for a tone point, e.g. 'PTA_Right_Air_1000'. kind is 'Air',
+    'Bone' or 'UCL'. The same few keys repeat across every point and session,
+    so each is built once and reused.
+    """
+    return f"PTA_{side}_{kind}_{int(freq)}"
+
+
 def get_float(parent: ET.Element, tag: str) -> Optional[float]:
     """Get float value from a child tag"""
     text = get_text(parent, tag)
@@ -61,6 +223,12 @@ def get_float(parent: ET.Element, tag: str) -> Optional[float]:
     return None
 
 
+def compliance_of(point) -> Optional[float]:
+    """ArgumentCompliance1 of a CompliancePoint's Compliance node"""
+    comp_node = find_first(point, './/Compliance')
+    return get_float(comp_node, 'ArgumentCompliance1') if comp_node is not None else None
+
+
 def classify_tympanogram_type(peak_pressure: Optional[float], peak_compliance: Optional[float]) -> str:
     """
     Classify tympanogram type based on Jerger classification.
@@ -106,20 +274,15 @@ def get_available_sessions(filepath: str) -> Dict[str, Any]:
             "tymp_sessions": [{"date": "2024-12-14", "display": "2024-12-14 左耳+右耳", "left": True, "right": True}, ...]
         }
     """
-    # Read and clean XML
-    with open(filepath, 'r', encoding='utf-8') as f:
-        xml_string = f.read()
-    
-    cleaned_xml = clean_xml(xml_string)
-    root = ET.fromstring(cleaned_xml)
+    # Read XML (namespaces removed)
+    root = load_root(filepath)
     
     # Extract patient info
     raw_first_name = get_text(root, 'FirstName') or ""
     raw_last_name = get_text(root, 'LastName') or ""
     patient_name = smart_clean_name(raw_first_name, raw_last_name)
     birth_date = get_text(root, 'PatientBirthDate') or get_text(root, 'BirthDate') or ""
-    if birth_date and 'T' in birth_date:
-        birth_date = birth_date.split('T')[0]
+    birth_date = birth_date.partition('T')[0]
     
     patient_info = {
         "Target_Patient_Name": patient_name,
@@ -130,36 +293,33 @@ def get_available_sessions(filepath: str) -> Dict[str, Any]:
     pta_dates = set()
     tymp_by_date: Dict[str, Dict[str, bool]] = {}  # date -> {"left": True/False, "right": True/False}
     
-    for action in root.findall('.//Action'):
-        action_date_elem = action.find('ActionDate')
+    for action in find_all(root, './/Action'):
+        action_date_elem = find_first(action, 'ActionDate')
         if action_date_elem is None or not action_date_elem.text:
             continue
         
         full_date_str = action_date_elem.text
-        date_key = full_date_str.split('T')[0]  # YYYY-MM-DD
+        date_key = full_date_str.partition('T')[0]  # YYYY-MM-DD
         
-        type_of_data = get_text(action, 'TypeOfData') or ""
-        description = get_text(action, 'Description') or ""
+        type_of_data = (get_text(action, 'TypeOfData') or "").lower()
+        description = (get_text(action, 'Description') or "").lower()
         
-        if 'audiogram' in type_of_data.lower():
+        if 'audiogram' in type_of_data:
             pta_dates.add(date_key)
         
-        elif 'impedance' in type_of_data.lower():
-            if date_key not in tymp_by_date:
-                tymp_by_date[date_key] = {"left": False, "right": False}
+        elif 'impedance' in type_of_data:
+            ears = tymp_by_date.setdefault(date_key, {"left": False, "right": False})
             
-            if 'left' in description.lower():
-                tymp_by_date[date_key]["left"] = True
-            elif 'right' in description.lower():
-                tymp_by_date[date_key]["right"] = True
+            if 'left' in description:
+                ears["left"] = True
+            elif 'right' in description:
+                ears["right"] = True
     
     # Build session lists
-    pta_sessions = []
-    for date in sorted(pta_dates, reverse=True):
-        pta_sessions.append({
-            "date": date,
-            "display": f"{date} 純音聽力"
-        })
+    pta_sessions = [
+        {"date": date, "display": f"{date} 純音聽力"}
+        for date in sorted(pta_dates, reverse=True)
+    ]
     
     tymp_sessions = []
     for date in sorted(tymp_by_date.keys(), reverse=True):
@@ -196,40 +356,37 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
     Returns:
         List of session dictionaries, sorted by date (newest first)
     """
-    # Read and clean XML
-    with open(filepath, 'r', encoding='utf-8') as f:
-        xml_string = f.read()
-    
-    cleaned_xml = clean_xml(xml_string)
-    root = ET.fromstring(cleaned_xml)
+    # Read XML (namespaces removed)
+    root = load_root(filepath)
     
     # ==========================================
     # Parse Patient Info
     # ==========================================
-    patient_elem = root.find('.//Patient/Patient')
+    patient_elem = find_first(root, './/Patient/Patient')
     if patient_elem is None:
-        patient_elem = root.find('.//Patient')
+        patient_elem = find_first(root, './/Patient')
     
     raw_first_name = ""
     raw_last_name = ""
     birth_date = ""
     
     if patient_elem is not None:
-        fn = patient_elem.find('FirstName')
-        ln = patient_elem.find('LastName')
+        fn = find_first(patient_elem, 'FirstName')
+        ln = find_first(patient_elem, 'LastName')
         # Try multiple variations for BirthDate
-        dob = patient_elem.find('DateofBirth')
+        dob = find_first(patient_elem, 'DateofBirth')
         if dob is None:
-            dob = patient_elem.find('DateOfBirth')
+            dob = find_first(patient_elem, 'DateOfBirth')
         if dob is None:
-            dob = patient_elem.find('BirthDate')
+            dob = find_first(patient_elem, 'BirthDate')
         
-        # DEBUG: Print all children of patient element to see available tags
-        print(f"[DEBUG] Patient element children: {[child.tag for child in patient_elem]}")
-        if dob is not None:
-             print(f"[DEBUG] Found DOB tag: {dob.tag}, text: {dob.text}")
-        else:
-             print("[DEBUG] DOB tag NOT FOUND")
+        # Log the patient element's tags to see which DOB tag a file uses
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Patient element children: %s", [child.tag for child in patient_elem])
+            if dob is not None:
+                logger.debug("Found DOB tag: %s, text: %s", dob.tag, dob.text)
+            else:
+                logger.debug("DOB tag NOT FOUND")
         
         raw_first_name = fn.text if fn is not None and fn.text else ""
         raw_last_name = ln.text if ln is not None and ln.text else ""
@@ -249,13 +406,13 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
     # ==========================================
     grouped_data: Dict[str, Dict[str, Any]] = {}
     
-    for action in root.findall('.//Action'):
-        action_date_elem = action.find('ActionDate')
+    for action in find_all(root, './/Action'):
+        action_date_elem = find_first(action, 'ActionDate')
         if action_date_elem is None or not action_date_elem.text:
             continue
         
         full_date_str = action_date_elem.text
-        date_key = full_date_str.split('T')[0]  # YYYY-MM-DD
+        date_key = full_date_str.partition('T')[0]  # YYYY-MM-DD
         
         if date_key not in grouped_data:
             parts = date_key.split('-')
@@ -268,39 +425,37 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
         
         current_session = grouped_data[date_key]
         
-        type_of_data = get_text(action, 'TypeOfData') or ""
-        description = get_text(action, 'Description') or ""
+        # One walk over the Action instead of a subtree search per lookup
+        action_index = index_tags(action)
+        
+        # Lowered once; only used for substring tests below
+        type_of_data = (index_text(action_index, 'TypeOfData') or "").lower()
+        description = (index_text(action_index, 'Description') or "").lower()
         
         # ==========================================
         # Parse Audiogram (Pure Tone + Speech)
         # ==========================================
-        if 'audiogram' in type_of_data.lower():
+        if 'audiogram' in type_of_data:
             
             # --- Pure Tone Audiometry ---
-            for tone_block in action.findall('.//ToneThresholdAudiogram'):
+            for tone_block in action_index.get('ToneThresholdAudiogram', ()):
                 output = get_text(tone_block, 'StimulusSignalOutput') or ""
-                output_lower = output.lower()
                 
-                # Determine ear side
-                is_right = 'right' in output_lower or output == '1'
-                is_left = 'left' in output_lower or output == '2'
-                side = "Right" if is_right else "Left" if is_left else None
+                # Determine ear side and conduction type
+                side, cond_type = signal_output_info(output)
+                side = side or _SIDE_CODES.get(output)
                 
                 if not side:
                     continue
                 
-                # Determine conduction type
-                is_bone = 'bone' in output_lower
-                cond_type = "Bone" if is_bone else "Air"
-                
                 # Extract test points
-                for pt_node in tone_block.findall('.//TonePoints'):
+                for pt_node in find_all(tone_block, './/TonePoints'):
                     freq = get_float(pt_node, 'StimulusFrequency')
                     level = get_float(pt_node, 'StimulusLevel')
                     status = get_text(pt_node, 'TonePointStatus') or ""
                     
                     if freq is not None and level is not None:
-                        key = f"PTA_{side}_{cond_type}_{int(freq)}"
+                        key = pta_key(side, cond_type, freq)
                         # Add NR suffix if TonePointStatus is NoResponse
                         if status.lower() == 'noresponse':
                             current_session[key] = f"{int(level)}NR"
@@ -308,24 +463,20 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
                             current_session[key] = str(int(level))
             
             # --- UCL (Uncomfortable Level) ---
-            for ucl_block in action.findall('.//UncomfortableLevel'):
+            for ucl_block in action_index.get('UncomfortableLevel', ()):
                 output = get_text(ucl_block, 'StimulusSignalOutput') or ""
-                output_lower = output.lower()
-                
-                is_right = 'right' in output_lower or output == '1'
-                is_left = 'left' in output_lower or output == '2'
-                side = "Right" if is_right else "Left" if is_left else None
+                side = signal_output_info(output)[0] or _SIDE_CODES.get(output)
                 
                 if not side:
                     continue
                 
-                for pt_node in ucl_block.findall('.//TonePoints'):
+                for pt_node in find_all(ucl_block, './/TonePoints'):
                     freq = get_float(pt_node, 'StimulusFrequency')
                     level = get_float(pt_node, 'StimulusLevel')
                     status = get_text(pt_node, 'TonePointStatus') or ""
                     
                     if freq is not None and level is not None:
-                        key = f"PTA_{side}_UCL_{int(freq)}"
+                        key = pta_key(side, 'UCL', freq)
                         # Add NR suffix if TonePointStatus is NoResponse
                         if status.lower() == 'noresponse':
                             current_session[key] = f"{int(level)}NR"
@@ -333,34 +484,24 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
                             current_session[key] = str(int(level))
             
             # --- SRT (Speech Reception Threshold) ---
-            for srt_block in action.findall('.//SpeechReceptionThresholdAudiogram'):
-                output = get_text(srt_block, 'StimulusSignalOutput') or ""
-                
-                if 'right' in output.lower():
-                    side = "Right"
-                elif 'left' in output.lower():
-                    side = "Left"
-                else:
+            for srt_block in action_index.get('SpeechReceptionThresholdAudiogram', ()):
+                side = signal_output_info(get_text(srt_block, 'StimulusSignalOutput') or "")[0]
+                if side is None:
                     continue
                 
-                for pt_node in srt_block.findall('.//SpeechReceptionPoints'):
+                for pt_node in find_all(srt_block, './/SpeechReceptionPoints'):
                     level = get_float(pt_node, 'StimulusLevel')
                     if level is not None:
                         current_session[f"Speech_{side}_SRT"] = str(int(level))
             
             # --- SDS (Speech Discrimination Score) - take max score ---
-            for sds_block in action.findall('.//SpeechDiscriminationAudiogram'):
-                output = get_text(sds_block, 'StimulusSignalOutput') or ""
-                
-                if 'right' in output.lower():
-                    side = "Right"
-                elif 'left' in output.lower():
-                    side = "Left"
-                else:
+            for sds_block in action_index.get('SpeechDiscriminationAudiogram', ()):
+                side = signal_output_info(get_text(sds_block, 'StimulusSignalOutput') or "")[0]
+                if side is None:
                     continue
                 
                 max_score = -1
-                for pt_node in sds_block.findall('.//SpeechDiscriminationPoints'):
+                for pt_node in find_all(sds_block, './/SpeechDiscriminationPoints'):
                     score = get_float(pt_node, 'ScorePercent')
                     if score is not None and score > max_score:
                         max_score = score
@@ -369,17 +510,12 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
                     current_session[f"Speech_{side}_SDS"] = str(int(max_score))
             
             # --- MCL (Most Comfortable Level) ---
-            for mcl_block in action.findall('.//SpeechMostComfortableLevel'):
-                output = get_text(mcl_block, 'StimulusSignalOutput') or ""
-                
-                if 'right' in output.lower():
-                    side = "Right"
-                elif 'left' in output.lower():
-                    side = "Left"
-                else:
+            for mcl_block in action_index.get('SpeechMostComfortableLevel', ()):
+                side = signal_output_info(get_text(mcl_block, 'StimulusSignalOutput') or "")[0]
+                if side is None:
                     continue
                 
-                for pt_node in mcl_block.findall('.//SpeechMostComfortablePoint'):
+                for pt_node in find_all(mcl_block, './/SpeechMostComfortablePoint'):
                     level = get_float(pt_node, 'StimulusLevel')
                     if level is not None:
                         current_session[f"Speech_{side}_MCL"] = str(int(level))
@@ -387,20 +523,21 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
         # ==========================================
         # Parse Impedance (Tympanometry)
         # ==========================================
-        elif 'impedance' in type_of_data.lower():
+        elif 'impedance' in type_of_data:
             # Determine ear side from description
-            if 'right' in description.lower():
+            if 'right' in description:
                 side = "Right"
-            elif 'left' in description.lower():
+            elif 'left' in description:
                 side = "Left"
             else:
                 continue
             
             # Find TympanogramTest block
-            tymp_test = action.find('.//TympanogramTest')
-            if tymp_test is not None:
+            tymp_tests = action_index.get('TympanogramTest')
+            if tymp_tests:
+                tymp_test = tymp_tests[0]
                 # Canal Volume (ECV)
-                cv_node = tymp_test.find('.//CanalVolume')
+                cv_node = find_first(tymp_test, './/CanalVolume')
                 if cv_node is not None:
                     cv_val = get_float(cv_node, 'ArgumentCompliance1')
                     if cv_val is not None:
@@ -410,33 +547,29 @@ def parse_noah_xml(filepath: str) -> List[Dict[str, Any]]:
                         current_session[f"Tymp_{side}_Vol"] = str(cv_val)
                 
                 # Peak Compliance (MaximumCompliance)
-                mc_node = tymp_test.find('.//MaximumCompliance')
-                peak_compliance = None
+                mc_node = find_first(tymp_test, './/MaximumCompliance')
                 if mc_node is not None:
                     mc_val = get_float(mc_node, 'ArgumentCompliance1')
                     if mc_val is not None:
                         # Normalize: divide by 100 if > 5
                         if mc_val > 5:
                             mc_val = round(mc_val / 100, 2)
-                        peak_compliance = mc_val
                         current_session[f"Tymp_{side}_Compliance"] = str(mc_val)
                 
                 # Peak Pressure - Find the CompliancePoint with the maximum compliance
                 # The correct peak pressure is the pressure at the point of maximum compliance
-                all_compliance_points = tymp_test.findall('.//CompliancePoint')
+                all_compliance_points = find_all(tymp_test, './/CompliancePoint')
                 
                 if all_compliance_points:
-                    max_compliance = -1
-                    peak_pressure = None
-                    
-                    for cp in all_compliance_points:
-                        pressure = get_float(cp, 'Pressure')
-                        comp_node = cp.find('.//Compliance')
-                        if comp_node is not None:
-                            compliance = get_float(comp_node, 'ArgumentCompliance1')
-                            if compliance is not None and compliance > max_compliance:
-                                max_compliance = compliance
-                                peak_pressure = pressure
+                    # max() keeps the first of equal maxima; only the winning
+                    # point's Pressure is read
+                    points = ((compliance_of(cp), cp) for cp in all_compliance_points)
+                    peak = max(
+                        (pt for pt in points if pt[0] is not None and pt[0] > -1),
+                        key=itemgetter(0),
+                        default=None,
+                    )
+                    peak_pressure = get_float(peak[1], 'Pressure') if peak else None
                     
                     if peak_pressure is not None:
                         current_session[f"Tymp_{side}_Pressure"] = str(int(peak_pressure))
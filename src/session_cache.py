@@ -0,0 +1,160 @@
+"""
+Session Cache
+Persists parsed NOAH sessions on disk so re-opening a file skips the XML parse,
+even across application restarts. Recently used files are also kept in memory.
+
+The cache holds the parsed sessions as plain JSON, including patient names
+and birth dates, under CONFIG_DIR/cache. It is only trimmed to MAX_ENTRIES;
+clear_disk_cache() removes it entirely.
+"""
+import os
+import json
+import logging
+import hashlib
+import threading
+import functools
+import copy
+from typing import List, Dict, Any, Optional
+
+from src.config_handler import CONFIG_DIR
+from src.parser import parse_noah_xml, get_available_sessions
+
+logger = logging.getLogger("hearing.session_cache")
+
+CACHE_DIR = os.path.join(CONFIG_DIR, 'cache')
+
+# Bump when parse_noah_xml output changes so stale entries are ignored
+# (2: lxml namespace handling and the clean_xml fallback for undeclared prefixes)
+CACHE_VERSION = 2
+
+# Files larger than this are parsed directly instead of being hashed
+MAX_HASH_SIZE = 50 * 1024 * 1024
+
+# Keep at most this many cached files on disk
+MAX_ENTRIES = 256
+
+# Keep at most this many parsed files in memory
+MEMORY_ENTRIES = 64
+
+
+def _cache_path(filepath: str) -> Optional[str]:
+    """Return the cache file path for an XML file, keyed by content hash."""
+    try:
+        if os.path.getsize(filepath) > MAX_HASH_SIZE:
+            return None
+        with open(filepath, 'rb') as f:
+            digest = hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+    return os.path.join(CACHE_DIR, f"{digest}.v{CACHE_VERSION}.json")
+
+
+def _prune():
+    """Drop the least recently used cache files once the cache grows past MAX_ENTRIES."""
+    try:
+        entries = sorted(
+            (e for e in os.scandir(CACHE_DIR) if e.name.endswith('.json')),
+            key=lambda e: e.stat().st_mtime,
+        )
+        for entry in entries[:-MAX_ENTRIES]:
+            os.remove(entry.path)
+    except OSError:
+        pass
+
+
+def load_sessions(filepath: str, st: Optional[os.stat_result] = None) -> List[Dict[str, Any]]:
+    """
+    Return parse_noah_xml(filepath), served from memory when the file is
+    unchanged since the last call, or from the on-disk cache when the same
+    file content has been parsed before.
+
+    st may be passed in when the caller already has the file's stat
+    (e.g. from os.scandir) to skip another stat call. The session dicts
+    are copies, so callers may modify them.
+    """
+    if st is None:
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return parse_noah_xml(filepath)
+    return [dict(s) for s in _load_cached(filepath, st.st_mtime_ns, st.st_size)]
+
+
+def clear_disk_cache():
+    """Delete every cached entry from disk (and memory)."""
+    clear_memory_cache()
+    try:
+        with os.scandir(CACHE_DIR) as it:
+            for entry in it:
+                if entry.name.endswith(('.json', '.tmp')):
+                    os.remove(entry.path)
+    except OSError as e:
+        logger.warning("Error clearing session cache: %s", e)
+
+
+def clear_memory_cache():
+    """Forget the in-memory entries (the on-disk cache is kept)."""
+    _load_cached.cache_clear()
+    _available_cached.cache_clear()
+
+
+@functools.lru_cache(maxsize=MEMORY_ENTRIES)
+def _load_cached(filepath: str, mtime_ns: int, size: int) -> List[Dict[str, Any]]:
+    """Memoised on (path, mtime, size) so an edited file is reloaded."""
+    return _load_from_disk(filepath)
+
+
+def _load_from_disk(filepath: str) -> List[Dict[str, Any]]:
+    cache_file = _cache_path(filepath)
+
+    if cache_file and os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                sessions = json.load(f)
+        except (OSError, ValueError):
+            pass  # Corrupt entry, re-parse below
+        else:
+            # Mark the entry as used so _prune keeps it
+            try:
+                os.utime(cache_file)
+            except OSError:
+                pass
+            return sessions
+
+    sessions = parse_noah_xml(filepath)
+
+    if cache_file:
+        # Write to a temporary file and rename it into place, so a concurrent
+        # reader or a crash never sees a half-written entry
+        tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(sessions, f, ensure_ascii=False)
+            os.replace(tmp_file, cache_file)
+            _prune()
+        except OSError as e:
+            logger.warning("Error saving session cache: %s", e)
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
+
+    return sessions
+
+
+def load_available_sessions(filepath: str) -> Dict[str, Any]:
+    """
+    Return get_available_sessions(filepath), memoised on (path, mtime, size).
+    The result is a copy, so callers may add keys to it.
+    """
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return get_available_sessions(filepath)
+    return copy.deepcopy(_available_cached(filepath, st.st_mtime_ns, st.st_size))
+
+
+@functools.lru_cache(maxsize=32)
+def _available_cached(filepath: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    return get_available_sessions(filepath)
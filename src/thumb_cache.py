@@ -0,0 +1,78 @@
+"""
+Thumbnail Cache
+Shrinks otoscopy photos to preview size once and keeps the result on disk,
+so the wizard never has to decode a full-size camera image to show it.
+"""
+import os
+import hashlib
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+from src.config_handler import CONFIG_DIR
+
+THUMB_DIR = os.path.join(CONFIG_DIR, 'thumbs')
+
+# Preview size used by the wizard
+THUMB_SIZE = (128, 128)
+
+# Keep at most this many thumbnails on disk
+MAX_THUMBS = 256
+
+
+def _prune():
+    """Drop the least recently used thumbnails once there are more than MAX_THUMBS."""
+    try:
+        entries = sorted(
+            (e for e in os.scandir(THUMB_DIR) if e.name.endswith('.png')),
+            key=lambda e: e.stat().st_mtime,
+        )
+        for entry in entries[:-MAX_THUMBS]:
+            os.remove(entry.path)
+    except OSError:
+        pass
+
+
+def get_thumbnail(path: str, size: Tuple[int, int] = THUMB_SIZE) -> Optional[str]:
+    """
+    Return the path of a cached thumbnail for the image at path, creating it
+    on first use. Keyed by (path, mtime, file size, thumbnail size), so an
+    edited photo gets a new thumbnail.
+
+    Returns None when Pillow is not installed or the image cannot be read.
+    """
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size[0]}x{size[1]}"
+    thumb_path = os.path.join(THUMB_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.png')
+    if os.path.exists(thumb_path):
+        # Mark the thumbnail as used so _prune keeps it
+        try:
+            os.utime(thumb_path)
+        except OSError:
+            pass
+        return thumb_path
+
+    try:
+        os.makedirs(THUMB_DIR, exist_ok=True)
+        with Image.open(path) as img:
+            # draft() lets the JPEG decoder skip most of the full-size image
+            img.draft('RGB', size)
+            # Phone cameras store rotation in EXIF instead of the pixels
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail(size)
+            img.save(thumb_path, 'PNG')
+    except Exception as e:
+        print(f"[Thumb] Error creating thumbnail for {path}: {e}")
+        return None
+    _prune()
+    return thumb_path
@@ -1,31 +1,25 @@
 import flet as ft
-from watchdog.observers import Observer
+import importlib
 import threading
 import os
+import atexit
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 
 from src.ui.theme import AppTheme
 from src.ui.components.app_navigation import AppNavigation
 from src.ui.components.session_wizard import SessionWizard
 from src.ui.pages.dashboard import DashboardPage
 from src.ui.pages.settings import SettingsPage
+from src.ui.coalesce import CoalescedCall
 from src.config_handler import load_config, save_config, encode_password, decode_password
-from src.file_watcher import XMLFileHandler
-from src.parser import parse_noah_xml, get_available_sessions
+from src.file_watcher import XMLFileHandler, create_observer, DEFAULT_POLL_INTERVAL
+from src.config import STORE_OPTIONS, PAYLOAD_CONSTANTS
+from src.session_cache import load_sessions, load_available_sessions
 
-# Store options (店家選擇)
-STORE_OPTIONS = {
-    "不切換 (使用預設)": "",
-    "桃園藝文店": "0O146270501766340937",
-    "龜山萬壽店": "0O303359038470254289",
-    "內壢忠孝二店": "0O309358019937740140",
-    "中壢環東店": "0O311663907407279810",
-    "彰化員林大同店": "0P345691397366329983",
-    "湖口成長店": "0O312542441306802027",
-    "北屯崇德店": "0O312543766542134683",
-    "西屯福科店": "0P343591528669372377",
-    "竹北中興店": "0P343592174119614845",
-    "羅東倉前店": "0P345513608514105513",
-}
+# Only the first few queued files are parsed ahead of time; the rest are
+# parsed when opened, so a large folder doesn't churn the session cache
+PREFETCH_LIMIT = 8
 
 class HearingApp:
     def __init__(self, page: ft.Page):
@@ -43,6 +37,7 @@ class HearingApp:
         self.watch_path = self.config.get("last_folder", "")
         self.active_profile_name = self.config.get("last_profile", "")
         self.store_id = self.config.get("store_id", "")
+        self.poll_interval = self.config.get("poll_interval", DEFAULT_POLL_INTERVAL)
         
         # Store options reference
         self.store_options = STORE_OPTIONS
@@ -51,9 +46,19 @@ class HearingApp:
         self.monitoring = False
         self.observer = None
         
+        # One worker so CRM uploads run one at a time
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hearing-auto")
+        atexit.register(self.executor.shutdown, wait=False)
+        self.automation_session = None  # Browser kept alive between uploads
+        
+        # Latest progress text, painted by a short coalescing timer
+        self._pending_progress = ""
+        self._progress_flusher = CoalescedCall(self._flush_progress, 0.05)
+        
         # Selected file for processing
         self.selected_file = None
         self.xml_data = {}
+        self.wizard = None  # Created on first use, then reset per file
         
         # --- UI Initialization ---
         self.dashboard_page = DashboardPage(self)
@@ -92,6 +97,16 @@ class HearingApp:
             
         self.check_sheet_status()
         self.update_dashboard_folder()
+        
+        # Warm up heavy imports off the UI thread
+        threading.Thread(target=self._prewarm, daemon=True).start()
+
+    def _prewarm(self):
+        """Import the automation stack in the background so the first upload doesn't stall."""
+        try:
+            importlib.import_module("src.automation")  # Pulls in playwright
+        except Exception as e:
+            print(f"[Prewarm] Skipped: {e}")
 
     def on_nav_change(self, e):
         idx = e.control.selected_index
@@ -148,10 +163,12 @@ class HearingApp:
             
             # Start watching for new files
             event_handler = XMLFileHandler(self.on_file_detected, self.on_file_deleted)
-            self.observer = Observer()
+            self.observer, is_polling = create_observer(self.watch_path, self.poll_interval)
             self.observer.schedule(event_handler, self.watch_path, recursive=False)
             self.observer.start()
             self.dashboard_page.log(f"開始監控: {self.watch_path}", "success")
+            if is_polling:
+                self.dashboard_page.log(f"網路磁碟，改用輪詢模式 (每 {self.poll_interval} 秒)", "info")
             
         self.dashboard_page.update_status(self.monitoring)
     
@@ -160,15 +177,29 @@ class HearingApp:
         if not self.watch_path or not os.path.isdir(self.watch_path):
             return
         
-        count = 0
-        for filename in os.listdir(self.watch_path):
-            if filename.lower().endswith('.xml'):
-                file_path = os.path.join(self.watch_path, filename)
-                self.dashboard_page.add_file_to_queue(file_path)
-                count += 1
+        found = []
+        with os.scandir(self.watch_path) as it:
+            for entry in it:
+                if entry.name.lower().endswith('.xml') and entry.is_file():
+                    self.dashboard_page.add_file_to_queue(entry.path)
+                    found.append((entry.path, entry.stat()))
+        
+        if found:
+            self.dashboard_page.log(f"發現 {len(found)} 個現有 XML 檔案", "info")
+            # Parse the backlog in the background so selecting a file is instant
+            threading.Thread(target=self._prefetch_sessions, args=(found[:PREFETCH_LIMIT],), daemon=True).start()
+
+    def _prefetch_sessions(self, entries):
+        """Parse queued (path, stat) entries in parallel to fill the session cache."""
+        def _load(entry):
+            file_path, st = entry
+            try:
+                load_sessions(file_path, st)
+            except Exception as e:
+                print(f"[Prefetch] {os.path.basename(file_path)}: {e}")
         
-        if count > 0:
-            self.dashboard_page.log(f"發現 {count} 個現有 XML 檔案", "info")
+        with ThreadPoolExecutor(max_workers=min(2, len(entries))) as executor:
+            list(executor.map(_load, entries))
 
     def on_file_detected(self, file_path):
         """Called when a new file is detected."""
@@ -188,10 +219,15 @@ class HearingApp:
     
     def on_file_selected(self, file_path):
         """Called when user selects a file from the queue."""
-        # Parse the XML file and update patient info
+        # Parse off the UI thread so large files don't freeze the window
+        self.page.run_thread(self._load_patient_info, file_path)
+    
+    def _load_patient_info(self, file_path):
+        """Parse the XML file and update patient info (runs on a worker thread)."""
         try:
-            from src.parser import parse_noah_xml
-            sessions = parse_noah_xml(file_path)
+            sessions = load_sessions(file_path)
+            if self.dashboard_page.selected_file != file_path:
+                return  # Another file was selected while parsing
             if sessions:
                 xml_data = sessions[0]
                 patient_name = xml_data.get("Target_Patient_Name", "未知")
@@ -222,13 +258,16 @@ class HearingApp:
         self.selected_file = file_path
         
         try:
-            session_info = get_available_sessions(file_path)
+            session_info = load_available_sessions(file_path)
             # Add spreadsheet_id for wizard
             session_info["spreadsheet_id"] = self.config.get("spreadsheet_id", "")
             
-            # Create and open wizard
-            wizard = SessionWizard(self.page, session_info, self.on_wizard_complete)
-            wizard.open()
+            # Reuse one wizard; it also owns two FilePickers in the page overlay
+            if self.wizard is None:
+                self.wizard = SessionWizard(self.page, session_info, self.on_wizard_complete)
+            else:
+                self.wizard.reset(session_info)
+            self.wizard.open()
             self.dashboard_page.log(f"開啟上傳精靈: {os.path.basename(file_path)}", "info")
         except Exception as e:
             self.show_snack(f"錯誤: {e}")
@@ -246,21 +285,23 @@ class HearingApp:
         self.dashboard_page.log(f"PTA: {result['pta_selection']}", "info")
         self.dashboard_page.log(f"Tymp: {result['tymp_selection']}", "info")
         
-        # Build config for automation
+        # Build config for automation (read-only snapshot, the worker must not
+        # see profile/store edits made while it runs)
         store_display_name = self.store_id
         store_actual_id = self.store_options.get(store_display_name, "")
+        profile = self.profiles.get(self.active_profile_name, {})
         
-        config = {
+        config = MappingProxyType({
             "url": "https://crm.greattree.com.tw/",
-            "username": self.profiles.get(self.active_profile_name, {}).get("username", ""),
-            "password": decode_password(self.profiles.get(self.active_profile_name, {}).get("password", "")),
+            "username": profile.get("username", ""),
+            "password": decode_password(profile.get("password", "")),
             "store_id": store_actual_id,
-        }
+        })
         
         self.dashboard_page.log(f"店別: {store_display_name} (ID: {store_actual_id})", "info")
         
         # Build payload from XML data + wizard result
-        sessions = parse_noah_xml(self.selected_file)
+        sessions = load_sessions(self.selected_file)
         selected_data = self._merge_session_data(sessions, result)
         
         self.dashboard_page.log("🚀 開始處理...", "info")
@@ -314,15 +355,35 @@ class HearingApp:
         self.page.open(self.progress_dialog)
         self.page.update()
         
-        # Define progress callback with step list
-        def progress_callback(msg):
-            self.page.run_task(self._update_progress_ui, msg)
+        # Progress messages arrive on the automation thread
+        progress_callback = self._update_progress_ui
+        
+        # Run automation on the worker thread
+        self.executor.submit(
+            self._run_automation, selected_data, self.selected_file, config, result, progress_callback
+        )
         
-        # Run automation in background thread
-        threading.Thread(
-            target=self._run_automation,
-            args=(selected_data, self.selected_file, config, result, progress_callback)
-        ).start()
+        # Parse the next queued file while this one uploads
+        next_file = self._next_pending_file(self.selected_file)
+        if next_file:
+            self.page.run_thread(self._preload_file, next_file)
+    
+    def _next_pending_file(self, current):
+        """Return the queued file after current, if any."""
+        pending = self.dashboard_page.pending_files
+        try:
+            idx = pending.index(current)
+        except ValueError:
+            return pending[0] if pending else None
+        return pending[idx + 1] if idx + 1 < len(pending) else None
+    
+    def _preload_file(self, file_path):
+        """Warm both session caches for a file (runs on a worker thread)."""
+        try:
+            load_sessions(file_path)
+            load_available_sessions(file_path)
+        except Exception as e:
+            print(f"[Preload] {os.path.basename(file_path)}: {e}")
     
     def _translate_progress_message(self, msg: str) -> str:
         """Translate technical progress messages to user-friendly Chinese."""
@@ -383,34 +444,45 @@ class HearingApp:
         return msg
     
     def _update_progress_ui(self, msg):
-        """Update progress dialog text."""
+        """Queue a progress message; bursts are painted at most every 50ms."""
         # Translate message
         friendly_msg = self._translate_progress_message(str(msg))
+        if not friendly_msg:
+            return
         
-        if friendly_msg:
-            self.progress_text.value = friendly_msg
-            self.page.update()
+        self._pending_progress = friendly_msg
+        self._progress_flusher.request(self.page)
+    
+    def _flush_progress(self):
+        """Show the most recent queued progress message."""
+        self.progress_text.value = self._pending_progress
+        if self.progress_text.page:
+            self.progress_text.update()
     
     def _merge_session_data(self, sessions, result):
         """Merge selected session data with wizard results."""
         pta_date = result["pta_selection"].split()[0] if result["pta_selection"] and result["pta_selection"] != "無" else None
         tymp_date = result["tymp_selection"].split()[0] if result["tymp_selection"] and result["tymp_selection"] != "無" else None
         
+        # Group sessions by test day once; several sessions can share a day
+        by_date = {}
+        for session in sessions:
+            by_date.setdefault(session.get("FullTestDate", "").split("T", 1)[0], []).append(session)
+        
         selected_data = {}
         
-        for session in sessions:
-            full_date = session.get("FullTestDate", "").split("T")[0]
-            
-            if pta_date and full_date == pta_date:
-                for key, value in session.items():
-                    if key.startswith("PTA_") or key.startswith("Speech_") or key.startswith("Test"):
-                        selected_data[key] = value
-                selected_data["FullTestDate"] = session.get("FullTestDate", "")
-            
-            if tymp_date and full_date == tymp_date:
-                for key, value in session.items():
-                    if key.startswith("Tymp_"):
-                        selected_data[key] = value
+        for session in by_date.get(pta_date, ()):
+            selected_data.update(
+                (key, value) for key, value in session.items()
+                if key.startswith(("PTA_", "Speech_", "Test"))
+            )
+            selected_data["FullTestDate"] = session.get("FullTestDate", "")
+        
+        for session in by_date.get(tymp_date, ()):
+            selected_data.update(
+                (key, value) for key, value in session.items()
+                if key.startswith("Tymp_")
+            )
         
         # Add patient info
         if sessions:
@@ -418,13 +490,15 @@ class HearingApp:
             selected_data["Patient_BirthDate"] = sessions[0].get("Patient_BirthDate", "")
         
         # Add wizard results
-        selected_data["InspectorName"] = result["inspector_name"]
-        selected_data["Otoscopy_Left_Clean"] = result["otoscopy"]["left_clean"]
-        selected_data["Otoscopy_Left_Intact"] = result["otoscopy"]["left_intact"]
-        selected_data["Otoscopy_Right_Clean"] = result["otoscopy"]["right_clean"]
-        selected_data["Otoscopy_Right_Intact"] = result["otoscopy"]["right_intact"]
-        selected_data["Speech_Left_Type"] = "1"
-        selected_data["Speech_Right_Type"] = "1"
+        otoscopy = result["otoscopy"]
+        selected_data.update({
+            "InspectorName": result["inspector_name"],
+            "Otoscopy_Left_Clean": otoscopy["left_clean"],
+            "Otoscopy_Left_Intact": otoscopy["left_intact"],
+            "Otoscopy_Right_Clean": otoscopy["right_clean"],
+            "Otoscopy_Right_Intact": otoscopy["right_intact"],
+        })
+        selected_data.update(PAYLOAD_CONSTANTS)
         
         return selected_data
     
@@ -438,11 +512,19 @@ class HearingApp:
         except (ValueError, TypeError):
             return None
     
+    def _get_automation_session(self):
+        """Create the shared browser session on first use (worker thread only)."""
+        if self.automation_session is None:
+            from src.automation import AutomationSession
+            self.automation_session = AutomationSession(headless=True)
+            atexit.register(self.automation_session.close)
+        return self.automation_session
+    
     def _run_automation(self, payload, filepath, config, wizard_result, progress_callback=None):
         """Run automation in background thread."""
         try:
-            from src.automation import run_automation_sync
-            run_automation_sync(payload, filepath, config, headless=True, progress_callback=progress_callback)
+            # Reuses the logged-in browser from earlier uploads
+            self._get_automation_session().run(payload, filepath, config, progress_callback=progress_callback)
             self.page.run_task(self._on_automation_success, filepath, wizard_result, payload)
         except Exception as e:
             self.page.run_task(self._on_automation_error, str(e), filepath)
@@ -553,6 +635,8 @@ class HearingApp:
         """Reset dashboard for next file."""
         self.selected_file = None
         self.xml_data = {}
+        # The session caches are kept: the next pending file was preloaded
+        # into them while this upload ran (they are bounded LRUs)
         self.dashboard_page.log("🔄 已重置，準備處理下一個檔案", "info")
 
     # --- Profile Management ---
@@ -586,6 +670,12 @@ class HearingApp:
         self.config["store_id"] = store_name
         save_config(self.config)
 
+    def set_poll_interval(self, seconds):
+        """Set the polling interval used for network folders (applies on next start)."""
+        self.poll_interval = seconds
+        self.config["poll_interval"] = seconds
+        save_config(self.config)
+
     # --- Sheets ---
     
     def update_sheet_config(self, url, sheet_id, sheet_name, title):
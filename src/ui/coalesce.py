@@ -0,0 +1,42 @@
+"""
+Coalesced UI updates
+Bursts of update requests from worker threads are folded into one call,
+run on the page's event loop at most once per interval.
+"""
+import asyncio
+import threading
+
+
+class CoalescedCall:
+    """
+    Calls callback once, interval seconds after the first request(); further
+    requests before then are absorbed. The wait runs as a task on the page's
+    event loop, so no thread is started per burst.
+    """
+
+    def __init__(self, callback, interval: float):
+        self.callback = callback
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def request(self, page):
+        """Schedule the callback on page's loop unless one is already pending."""
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            page.run_task(self._run)
+        except Exception as e:
+            with self._lock:
+                self._scheduled = False
+            print(f"[UI] Error scheduling update: {e}")
+
+    async def _run(self):
+        await asyncio.sleep(self.interval)
+        # Clear the flag first so a request arriving during the callback
+        # schedules another run instead of being lost
+        with self._lock:
+            self._scheduled = False
+        self.callback()
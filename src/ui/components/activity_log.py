@@ -1,11 +1,23 @@
 import flet as ft
-import datetime
+import time
+import threading
 from src.ui.theme import AppTheme
+from src.ui.coalesce import CoalescedCall
 
 class ActivityLog(ft.Container):
+    # Coalesce redraws: bursts of messages are flushed at most this often (seconds)
+    FLUSH_INTERVAL = 0.1
+    
     def __init__(self):
         super().__init__()
         
+        self._lock = threading.Lock()
+        self._flusher = CoalescedCall(self._flush, self.FLUSH_INTERVAL)
+        
+        # Timestamp text is reformatted at most once per second
+        self._ts_sec = None
+        self._ts_str = ""
+        
         self.log_list = ft.ListView(spacing=5, expand=True, auto_scroll=True)
         
         self.content = ft.Column([
@@ -31,7 +43,7 @@ class ActivityLog(ft.Container):
         }
         icon_name, icon_color = icon_map.get(type, icon_map["info"])
         
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
+        timestamp = self._timestamp()
         
         item = ft.Row([
             ft.Text(timestamp, size=11, color=AppTheme.TEXT_HINT),
@@ -39,7 +51,21 @@ class ActivityLog(ft.Container):
             ft.Text(message, size=13, expand=True),
         ], spacing=10, vertical_alignment=ft.CrossAxisAlignment.CENTER)
         
-        self.log_list.controls.append(item)
-        
-        if self.page:
-            self.log_list.update()
+        with self._lock:
+            self.log_list.controls.append(item)
+        page = self.page
+        if page:
+            self._flusher.request(page)
+
+    def _timestamp(self) -> str:
+        now = int(time.time())
+        if now != self._ts_sec:
+            self._ts_sec = now
+            self._ts_str = time.strftime("%H:%M:%S", time.localtime(now))
+        return self._ts_str
+
+    def _flush(self):
+        """Send all messages added since the last flush in one update."""
+        with self._lock:
+            if self.page:
+                self.log_list.update()
@@ -5,6 +5,8 @@ Multi-page wizard dialog for session selection and upload configuration.
 import flet as ft
 from typing import Dict, Any, Callable, Optional
 
+from src.thumb_cache import get_thumbnail
+
 class SessionWizard:
     """Multi-page wizard dialog for session selection."""
     
@@ -17,19 +19,20 @@ class SessionWizard:
         # Data
         self.inspector_name = ft.TextField(label="檢查人員姓名 *", prefix_icon=ft.Icons.PERSON)
         
-        pta_options = [s["display"] for s in session_info.get("pta_sessions", [])]
-        tymp_options = [s["display"] for s in session_info.get("tymp_sessions", [])]
+        # Display strings for the session dropdowns ("無" when there are none)
+        self.pta_options = tuple(s["display"] for s in session_info.get("pta_sessions", [])) or ("無",)
+        self.tymp_options = tuple(s["display"] for s in session_info.get("tymp_sessions", [])) or ("無",)
         
         self.pta_dropdown = ft.Dropdown(
             label="選擇純音聽力報告",
-            options=[ft.dropdown.Option(o) for o in pta_options] if pta_options else [ft.dropdown.Option("無")],
-            value=pta_options[0] if pta_options else "無",
+            options=[ft.dropdown.Option(o) for o in self.pta_options],
+            value=self.pta_options[0],
         )
         
         self.tymp_dropdown = ft.Dropdown(
             label="選擇中耳鼓室圖報告",
-            options=[ft.dropdown.Option(o) for o in tymp_options] if tymp_options else [ft.dropdown.Option("無")],
-            value=tymp_options[0] if tymp_options else "無",
+            options=[ft.dropdown.Option(o) for o in self.tymp_options],
+            value=self.tymp_options[0],
         )
         
         # Ear image paths
@@ -37,6 +40,9 @@ class SessionWizard:
         self.right_image_path = None
         self.left_image_text = ft.Text("未選擇檔案", size=12, color=ft.Colors.GREY_400)
         self.right_image_text = ft.Text("未選擇檔案", size=12, color=ft.Colors.GREY_400)
+        # Thumbnails of the picked photos (shown only when one can be made)
+        self.left_image_preview = ft.Image(width=64, height=64, fit=ft.ImageFit.CONTAIN, visible=False)
+        self.right_image_preview = ft.Image(width=64, height=64, fit=ft.ImageFit.CONTAIN, visible=False)
         
         self.left_file_picker = ft.FilePicker(on_result=self.on_left_image_picked)
         self.right_file_picker = ft.FilePicker(on_result=self.on_right_image_picked)
@@ -172,6 +178,8 @@ class SessionWizard:
         """Build the wizard dialog."""
         patient_name = self.session_info.get("patient_info", {}).get("Target_Patient_Name", "未知")
         birth_date = self.session_info.get("patient_info", {}).get("Patient_BirthDate", "")
+        self.patient_name_text = ft.Text(f"👤 病患: {patient_name}", weight=ft.FontWeight.BOLD)
+        self.birth_date_text = ft.Text(f"🎂 生日: {birth_date}", color=ft.Colors.GREY)
         
         # Page 1: Basic settings
         self.page1 = ft.Column([
@@ -179,8 +187,8 @@ class SessionWizard:
             ft.Card(
                 content=ft.Container(
                     content=ft.Column([
-                        ft.Text(f"👤 病患: {patient_name}", weight=ft.FontWeight.BOLD),
-                        ft.Text(f"🎂 生日: {birth_date}", color=ft.Colors.GREY),
+                        self.patient_name_text,
+                        self.birth_date_text,
                     ]),
                     padding=15,
                 ),
@@ -190,54 +198,80 @@ class SessionWizard:
             self.tymp_dropdown,
         ], spacing=15)
         
-        # Page 2: Otoscopy
-        self.page2 = ft.Column([
+        # Pages 2 and 3 are built on first visit (see show_page)
+        self.page2 = None
+        self.page3 = None
+        self.summary_text = ft.Text("", size=13)
+        
+        # Content container
+        self.content = ft.Container(content=self.page1, width=500, height=480)
+        
+        # Navigation buttons
+        self.prev_btn = ft.TextButton("← 上一步", on_click=self.prev_page, visible=False)
+        self.next_btn = ft.ElevatedButton("下一步 →", on_click=self.next_page)
+        self.submit_btn = ft.ElevatedButton(
+            "🚀 送出到 CRM", 
+            on_click=self.submit,
+            visible=False,
+            style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN, color=ft.Colors.WHITE),
+        )
+        
+        self.dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Row([
+                ft.Text("📋 聽力報告設定精靈", size=20, weight=ft.FontWeight.BOLD),
+                ft.IconButton(ft.Icons.CLOSE, on_click=self.close, icon_color=ft.Colors.GREY, tooltip="關閉")
+            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+            content=self.content,
+            actions=[
+                self.prev_btn,
+                self.next_btn,
+                self.submit_btn,
+            ],
+            actions_alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
+        )
+    
+    def _build_page2(self) -> ft.Column:
+        """Build page 2 (otoscopy) on its first visit."""
+        return ft.Column([
             ft.Text("步驟 2/3：耳鏡檢查設定", size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE),
-            # Left ear
-            ft.Card(
-                content=ft.Container(
-                    content=ft.Column([
-                        ft.Text("👂 左耳 Left", weight=ft.FontWeight.BOLD, size=16),
-                        ft.Divider(),
-                        ft.Row([ft.Text("耳道乾淨：", width=100), self.left_clean]),
-                        ft.Row([ft.Text("鼓膜完整：", width=100), self.left_intact]),
-                        ft.Divider(),
-                        ft.Row([
-                            ft.ElevatedButton("上傳左耳圖", icon=ft.Icons.UPLOAD_FILE, 
-                                            on_click=lambda _: self.left_file_picker.pick_files(allow_multiple=False)),
-                            self.left_image_text
-                        ])
-                    ]),
-                    padding=15,
-                    bgcolor=ft.Colors.BLUE_900,
-                    border_radius=10,
-                ),
+            self._build_ear_panel(
+                "👂 左耳 Left", ft.Colors.BLUE_900, self.left_clean, self.left_intact,
+                "上傳左耳圖", self.left_file_picker, self.left_image_text, self.left_image_preview,
             ),
-            # Right ear
-            ft.Card(
-                content=ft.Container(
-                    content=ft.Column([
-                        ft.Text("👂 右耳 Right", weight=ft.FontWeight.BOLD, size=16),
-                        ft.Divider(),
-                        ft.Row([ft.Text("耳道乾淨：", width=100), self.right_clean]),
-                        ft.Row([ft.Text("鼓膜完整：", width=100), self.right_intact]),
-                        ft.Divider(),
-                        ft.Row([
-                            ft.ElevatedButton("上傳右耳圖", icon=ft.Icons.UPLOAD_FILE, 
-                                            on_click=lambda _: self.right_file_picker.pick_files(allow_multiple=False)),
-                            self.right_image_text
-                        ])
-                    ]),
-                    padding=15,
-                    bgcolor=ft.Colors.RED_900,
-                    border_radius=10,
-                ),
+            self._build_ear_panel(
+                "👂 右耳 Right", ft.Colors.RED_900, self.right_clean, self.right_intact,
+                "上傳右耳圖", self.right_file_picker, self.right_image_text, self.right_image_preview,
             ),
         ], spacing=15, scroll=ft.ScrollMode.AUTO)
-        
-        # Page 3: Summary + Google Sheets Options
-        self.summary_text = ft.Text("", size=13)
-        
+    
+    def _build_ear_panel(self, title: str, bgcolor: str, clean: ft.RadioGroup, intact: ft.RadioGroup,
+                         upload_label: str, picker: ft.FilePicker, image_text: ft.Text,
+                         image_preview: ft.Image) -> ft.Card:
+        """Build one ear's otoscopy card (page 2 has one per side)."""
+        return ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Text(title, weight=ft.FontWeight.BOLD, size=16),
+                    ft.Divider(),
+                    ft.Row([ft.Text("耳道乾淨：", width=100), clean]),
+                    ft.Row([ft.Text("鼓膜完整：", width=100), intact]),
+                    ft.Divider(),
+                    ft.Row([
+                        ft.ElevatedButton(upload_label, icon=ft.Icons.UPLOAD_FILE,
+                                          on_click=lambda _: picker.pick_files(allow_multiple=False)),
+                        image_text,
+                        image_preview,
+                    ]),
+                ]),
+                padding=15,
+                bgcolor=bgcolor,
+                border_radius=10,
+            ),
+        )
+    
+    def _build_page3(self) -> ft.Column:
+        """Build page 3 (summary + Google Sheets options) on its first visit."""
         page3_content = [
             ft.Text("步驟 3/3：確認並送出", size=20, weight=ft.FontWeight.BOLD, color=ft.Colors.BLUE),
             ft.Card(
@@ -261,35 +295,59 @@ class SessionWizard:
                 )
             )
         
-        self.page3 = ft.Column(page3_content, spacing=15, scroll=ft.ScrollMode.AUTO)
+        return ft.Column(page3_content, spacing=15, scroll=ft.ScrollMode.AUTO)
+    
+    def reset(self, session_info: Dict):
+        """
+        Point the wizard at another file and restore every field to its
+        default, so one instance can be reopened for each patient.
+        """
+        self.session_info = session_info
+        patient_info = session_info.get("patient_info", {})
+        self.patient_name_text.value = f"👤 病患: {patient_info.get('Target_Patient_Name', '未知')}"
+        self.birth_date_text.value = f"🎂 生日: {patient_info.get('Patient_BirthDate', '')}"
         
-        # Content container
-        self.content = ft.Container(content=self.page1, width=500, height=480)
+        self.pta_options = tuple(s["display"] for s in session_info.get("pta_sessions", [])) or ("無",)
+        self.tymp_options = tuple(s["display"] for s in session_info.get("tymp_sessions", [])) or ("無",)
+        self.pta_dropdown.options = [ft.dropdown.Option(o) for o in self.pta_options]
+        self.pta_dropdown.value = self.pta_options[0]
+        self.tymp_dropdown.options = [ft.dropdown.Option(o) for o in self.tymp_options]
+        self.tymp_dropdown.value = self.tymp_options[0]
         
-        # Navigation buttons
-        self.prev_btn = ft.TextButton("← 上一步", on_click=self.prev_page, visible=False)
-        self.next_btn = ft.ElevatedButton("下一步 →", on_click=self.next_page)
-        self.submit_btn = ft.ElevatedButton(
-            "🚀 送出到 CRM", 
-            on_click=self.submit,
-            visible=False,
-            style=ft.ButtonStyle(bgcolor=ft.Colors.GREEN, color=ft.Colors.WHITE),
-        )
+        self.inspector_name.value = ""
+        for group in (self.left_clean, self.left_intact, self.right_clean, self.right_intact):
+            group.value = "True"
         
-        self.dialog = ft.AlertDialog(
-            modal=True,
-            title=ft.Row([
-                ft.Text("📋 聽力報告設定精靈", size=20, weight=ft.FontWeight.BOLD),
-                ft.IconButton(ft.Icons.CLOSE, on_click=self.close, icon_color=ft.Colors.GREY, tooltip="關閉")
-            ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-            content=self.content,
-            actions=[
-                self.prev_btn,
-                self.next_btn,
-                self.submit_btn,
-            ],
-            actions_alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
-        )
+        self.left_image_path = None
+        self.right_image_path = None
+        for text in (self.left_image_text, self.right_image_text):
+            text.value = "未選擇檔案"
+            text.color = ft.Colors.GREY_400
+        for preview in (self.left_image_preview, self.right_image_preview):
+            preview.src = None
+            preview.visible = False
+        
+        # Page 3 only shows the Sheets card when a spreadsheet is linked
+        sheets_configured = bool(session_info.get("spreadsheet_id"))
+        if sheets_configured != self.sheets_configured:
+            self.sheets_configured = sheets_configured
+            self.page3 = None
+        
+        self.sheets_checkbox.value = False
+        for checkbox in self.customer_source_checkboxes.values():
+            checkbox.value = False
+        for field in (self.sheets_phone, self.customer_source_display, self.sheets_clinic_name,
+                      self.sheets_store_code, self.sheets_recommend_id,
+                      self.sheets_voucher_count, self.sheets_voucher_id,
+                      self.sheets_transaction_amount):
+            field.value = ""
+        self.sheets_invitation_card.value = None
+        self.sheets_is_deal.value = None
+        self.sheets_fields_container.visible = False
+        self.invitation_card_fields_container.visible = False
+        self.sheets_transaction_amount.visible = False
+        
+        self.show_page(0)
     
     def open(self):
         """Open the dialog."""
@@ -315,6 +373,8 @@ class SessionWizard:
             actions.append(self.next_btn)
             
         elif index == 1:
+            if self.page2 is None:
+                self.page2 = self._build_page2()
             self.content.content = self.page2
             self.prev_btn.visible = True
             self.next_btn.visible = True
@@ -322,6 +382,8 @@ class SessionWizard:
             actions.append(self.next_btn)
             
         elif index == 2:
+            if self.page3 is None:
+                self.page3 = self._build_page3()
             self.update_summary()
             self.content.content = self.page3
             self.prev_btn.visible = True
@@ -353,6 +415,7 @@ class SessionWizard:
             self.left_image_path = e.files[0].path
             self.left_image_text.value = e.files[0].name
             self.left_image_text.color = ft.Colors.WHITE
+            self._show_thumbnail(self.left_image_preview, self.left_image_path)
             self.page.update()
 
     def on_right_image_picked(self, e: ft.FilePickerResultEvent):
@@ -360,8 +423,15 @@ class SessionWizard:
             self.right_image_path = e.files[0].path
             self.right_image_text.value = e.files[0].name
             self.right_image_text.color = ft.Colors.WHITE
+            self._show_thumbnail(self.right_image_preview, self.right_image_path)
             self.page.update()
 
+    def _show_thumbnail(self, preview: ft.Image, image_path: Optional[str]):
+        """Point a preview at the cached thumbnail of image_path, if one can be made."""
+        thumb = get_thumbnail(image_path) if image_path else None
+        preview.src = thumb
+        preview.visible = thumb is not None
+
     def _toggle_sheets_fields(self, e):
         """Toggle visibility of Google Sheets fields."""
         self.sheets_fields_container.visible = self.sheets_checkbox.value
@@ -381,11 +451,9 @@ class SessionWizard:
 
     def _get_selected_customer_sources(self) -> str:
         """Get comma-separated string of selected customer sources."""
-        selected = []
-        for option, checkbox in self.customer_source_checkboxes.items():
-            if checkbox.value:
-                selected.append(option)
-        return ", ".join(selected)
+        return ", ".join(
+            option for option, checkbox in self.customer_source_checkboxes.items() if checkbox.value
+        )
     
     def _update_customer_source_display(self, e):
         """Update the customer source display field."""
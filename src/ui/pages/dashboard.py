@@ -15,6 +15,7 @@ class DashboardPage(ft.Container):
         # File queue storage
         self.pending_files = []  # List of file paths in queue
         self.selected_file = None  # Currently selected file
+        self._file_items = {}  # file path -> list item control
         
         # --- Monitor Button (integrated into header) ---
         self.monitor_btn = ft.ElevatedButton(
@@ -128,6 +129,7 @@ class DashboardPage(ft.Container):
         
         # --- Pending File Queue ---
         self.pending_list_view = ft.ListView(spacing=5, expand=True)
+        self.empty_queue_text = ft.Text("尚無待處理檔案", color=AppTheme.TEXT_HINT, italic=True, size=13)
         self.file_count_text = ft.Text("0 個檔案", size=12, color=AppTheme.TEXT_HINT)
         
         self.pending_card = ft.Container(
@@ -191,8 +193,7 @@ class DashboardPage(ft.Container):
             self.monitor_btn.icon = ft.Icons.PLAY_ARROW
             self.monitor_btn.bgcolor = AppTheme.SUCCESS
             
-        self.monitor_btn.update()
-        self.status_card_mon.update()
+        self.page.update(self.monitor_btn, self.status_card_mon)
         
     def update_folder(self, path: str):
         self.folder_text.value = path if path else "尚未選擇資料夾..."
@@ -233,6 +234,7 @@ class DashboardPage(ft.Container):
             return  # Already in queue
         
         self.pending_files.append(file_path)
+        self._file_items[file_path] = self._build_file_item(file_path)
         self._refresh_pending_list()
         
         # Auto-select first file if nothing selected
@@ -245,6 +247,7 @@ class DashboardPage(ft.Container):
             return
         
         self.pending_files.remove(file_path)
+        self._file_items.pop(file_path, None)
         
         # Clear selection if the removed file was selected
         if self.selected_file == file_path:
@@ -257,23 +260,26 @@ class DashboardPage(ft.Container):
         """Select a file from the queue for processing."""
         if file_path not in self.pending_files:
             return
-            
+        
+        previous = self.selected_file
         self.selected_file = file_path
-        filename = os.path.basename(file_path)
+        filename = self._file_items[file_path].data
         
         # Update patient card
         self.patient_name.value = f"已選擇: {filename}"
         self.patient_info.value = f"路徑: {file_path}"
         self.process_btn.disabled = False
         
-        # Refresh list to show selection highlight
-        self._refresh_pending_list()
+        # Move the selection highlight (only the two affected rows change)
+        rows = []
+        for path in (previous, file_path):
+            item = self._file_items.get(path)
+            if item:
+                self._style_file_item(item, path == file_path)
+                rows.append(item)
         
         # Update UI
-        if self.page:
-            self.patient_name.update()
-            self.patient_info.update()
-            self.process_btn.update()
+        self._update_patient_card(*rows)
         
         # Trigger file load in app
         self.app.on_file_selected(file_path)
@@ -284,65 +290,54 @@ class DashboardPage(ft.Container):
         self.patient_info.value = ""
         self.process_btn.disabled = True
         
-        if self.page:
-            self.patient_name.update()
-            self.patient_info.update()
-            self.process_btn.update()
+        self._update_patient_card()
+    
+    def _build_file_item(self, file_path: str) -> ft.Container:
+        """Create the list row for a queued file (built once per file)."""
+        filename = os.path.basename(file_path)
+        item = ft.Container(
+            content=ft.Row([
+                ft.Icon(size=18),
+                ft.Text(filename, size=13, expand=True, no_wrap=True),
+                ft.Text("已選擇", size=10, color=AppTheme.SUCCESS, italic=True),
+            ], spacing=10),
+            padding=10,
+            border_radius=8,
+            on_click=lambda e, fp=file_path: self.select_file(fp),
+            ink=True,
+            data=filename,
+        )
+        self._style_file_item(item, file_path == self.selected_file)
+        return item
+    
+    def _style_file_item(self, item: ft.Container, is_selected: bool):
+        """Apply the selected/unselected look to a list row."""
+        icon, name, badge = item.content.controls
+        icon.name = ft.Icons.CHECK_CIRCLE if is_selected else ft.Icons.DESCRIPTION
+        icon.color = AppTheme.SUCCESS if is_selected else AppTheme.TEXT_SECONDARY
+        name.weight = ft.FontWeight.BOLD if is_selected else None
+        name.color = AppTheme.SUCCESS if is_selected else AppTheme.TEXT_PRIMARY
+        badge.visible = is_selected
+        item.bgcolor = AppTheme.PRIMARY_CONTAINER if is_selected else AppTheme.BACKGROUND
+        item.border = ft.border.all(2, AppTheme.SUCCESS) if is_selected else None
     
     def _refresh_pending_list(self):
-        """Refresh the pending file list UI."""
-        self.pending_list_view.controls.clear()
-        
-        if not self.pending_files:
-            self.pending_list_view.controls.append(
-                ft.Text("尚無待處理檔案", color=AppTheme.TEXT_HINT, italic=True, size=13)
-            )
+        """Sync the pending list UI with the queue, reusing existing rows."""
+        if self.pending_files:
+            self.pending_list_view.controls = [self._file_items[fp] for fp in self.pending_files]
         else:
-            for file_path in self.pending_files:
-                is_selected = (file_path == self.selected_file)
-                filename = os.path.basename(file_path)
-                
-                item = ft.Container(
-                    content=ft.Row([
-                        ft.Icon(
-                            ft.Icons.CHECK_CIRCLE if is_selected else ft.Icons.DESCRIPTION,
-                            size=18,
-                            color=AppTheme.SUCCESS if is_selected else AppTheme.TEXT_SECONDARY
-                        ),
-                        ft.Text(
-                            filename,
-                            size=13,
-                            expand=True,
-                            no_wrap=True,
-                            weight=ft.FontWeight.BOLD if is_selected else None,
-                            color=AppTheme.SUCCESS if is_selected else AppTheme.TEXT_PRIMARY
-                        ),
-                        ft.Text(
-                            "已選擇" if is_selected else "",
-                            size=10,
-                            color=AppTheme.SUCCESS,
-                            italic=True
-                        ) if is_selected else ft.Container()
-                    ], spacing=10),
-                    padding=10,
-                    border_radius=8,
-                    bgcolor=AppTheme.PRIMARY_CONTAINER if is_selected else AppTheme.BACKGROUND,
-                    border=ft.border.all(2, AppTheme.SUCCESS) if is_selected else None,
-                    on_click=lambda e, fp=file_path: self.select_file(fp),
-                    ink=True
-                )
-                self.pending_list_view.controls.append(item)
+            self.pending_list_view.controls = [self.empty_queue_text]
         
         # Update file count
         self.file_count_text.value = f"{len(self.pending_files)} 個檔案"
         
         if self.page:
-            self.pending_list_view.update()
-            self.file_count_text.update()
+            self.page.update(self.pending_list_view, self.file_count_text)
     
     def clear_queue(self):
         """Clear all files from the queue."""
         self.pending_files.clear()
+        self._file_items.clear()
         self.selected_file = None
         self._reset_patient_card()
         self._refresh_pending_list()
@@ -353,12 +348,16 @@ class DashboardPage(ft.Container):
         self.patient_info.value = info
         self.process_btn.disabled = False
         
+        self._update_patient_card()
+    
+    def _update_patient_card(self, *extra: ft.Control):
+        """Send the patient card (and any other changed controls) in one update."""
         if self.page:
-            self.patient_name.update()
-            self.patient_info.update()
-            self.process_btn.update()
+            self.page.update(self.patient_name, self.patient_info, self.process_btn, *extra)
     
     def mark_file_processed(self, file_path: str):
         """Mark a file as processed and remove from queue."""
+        item = self._file_items.get(file_path)
+        filename = item.data if item else os.path.basename(file_path)
         self.remove_file_from_queue(file_path)
-        self.log(f"已處理: {os.path.basename(file_path)}", "success")
+        self.log(f"已處理: {filename}", "success")
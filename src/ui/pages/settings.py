@@ -1,5 +1,6 @@
 import flet as ft
 from src.ui.theme import AppTheme
+from src.config import STORE_NAMES
 from src.sheets_writer import get_service_account_email, list_worksheets, get_spreadsheet_name, extract_spreadsheet_id
 
 class SettingsPage(ft.Container):
@@ -84,7 +85,7 @@ class SettingsPage(ft.Container):
         # --- Store Selection ---
         self.store_dropdown = ft.Dropdown(
             label="選擇門市",
-            options=[ft.dropdown.Option(name) for name in self.app.store_options.keys()],
+            options=[ft.dropdown.Option(name) for name in STORE_NAMES],
             value=self.app.store_id or "不切換 (使用預設)",
             on_change=self.on_store_change,
             expand=True
@@ -105,6 +106,30 @@ class SettingsPage(ft.Container):
             border_radius=12
         )
         
+        # --- Monitoring ---
+        self.poll_dropdown = ft.Dropdown(
+            label="網路磁碟輪詢間隔",
+            options=[ft.dropdown.Option(str(sec), f"{sec} 秒") for sec in (1, 2, 5, 10, 30)],
+            value=str(self.app.poll_interval),
+            on_change=self.on_poll_interval_change,
+            expand=True
+        )
+        
+        self.monitor_card = ft.Container(
+            content=ft.Column([
+                ft.Row([
+                    ft.Icon(ft.Icons.FOLDER_SHARED, color=AppTheme.PRIMARY),
+                    ft.Text("監控設定", size=18, weight=ft.FontWeight.BOLD)
+                ], spacing=10),
+                ft.Divider(),
+                ft.Text("監控資料夾位於網路磁碟時改用輪詢，下次開始監控時生效", size=13, color=AppTheme.TEXT_SECONDARY),
+                self.poll_dropdown
+            ], spacing=15),
+            padding=25,
+            bgcolor=AppTheme.SURFACE,
+            border_radius=12
+        )
+        
         # --- Layout ---
         self.content = ft.Column([
             self.header,
@@ -113,18 +138,20 @@ class SettingsPage(ft.Container):
             ft.Container(height=20),
             self.store_card,
             ft.Container(height=20),
+            self.monitor_card,
+            ft.Container(height=20),
             self.sheets_card
         ], scroll=ft.ScrollMode.AUTO, expand=True)
         
         self.refresh_profiles()
 
     def refresh_profiles(self):
-        self.profile_list.controls.clear()
+        rows = []
         profiles = self.app.profiles
         active = self.app.active_profile_name
         
         if not profiles:
-            self.profile_list.controls.append(
+            rows.append(
                 ft.Text("尚無帳號資料", color=AppTheme.TEXT_HINT, italic=True)
             )
         else:
@@ -148,8 +175,10 @@ class SettingsPage(ft.Container):
                     on_click=lambda e, n=name: self.activate_profile(n),
                     ink=True
                 )
-                self.profile_list.controls.append(row)
-                
+                rows.append(row)
+        
+        # Replace all rows in one assignment
+        self.profile_list.controls = rows
         if self.page:
             self.profile_list.update()
 
@@ -222,3 +251,9 @@ class SettingsPage(ft.Container):
         # Update dashboard badge
         self.app.dashboard_page.update_store_badge(store_name)
         self.app.show_snack(f"已選擇門市: {store_name}")
+
+    def on_poll_interval_change(self, e):
+        """Handle polling interval dropdown change."""
+        seconds = int(self.poll_dropdown.value)
+        self.app.set_poll_interval(seconds)
+        self.app.show_snack(f"輪詢間隔: {seconds} 秒")
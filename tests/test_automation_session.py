@@ -0,0 +1,90 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from src import automation
+from src.automation import AutomationSession, PatientNotFoundError, PlaywrightError
+
+
+class FakeAutomation:
+    """Stands in for HearingAutomation; each run pops the next outcome from plan."""
+    plan = []
+    started = 0
+    moved = []
+
+    def __init__(self, headless=True, progress_callback=None):
+        self.progress_callback = progress_callback
+        self.case_submitted = False
+
+    async def start(self):
+        FakeAutomation.started += 1
+
+    async def close(self):
+        pass
+
+    def _log(self, message):
+        pass
+
+    def _move_file_to_failed(self, filepath):
+        FakeAutomation.moved.append(filepath)
+
+    async def run_automation(self, data_payload, xml_filepath, user_config, move_failed=True):
+        outcome = FakeAutomation.plan.pop(0)
+        if outcome is None:
+            return
+        if outcome == "submitted":
+            self.case_submitted = True
+            outcome = PlaywrightError("page closed after submit")
+        if move_failed:
+            self._move_file_to_failed(xml_filepath)
+        raise outcome
+
+
+class TestAutomationSession(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patches = [
+            mock.patch.object(automation, "HearingAutomation", FakeAutomation),
+            mock.patch.object(automation, "FAILURE_LOG", os.path.join(self.tmp.name, "failures.log")),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        FakeAutomation.started = 0
+        FakeAutomation.moved = []
+        self.session = AutomationSession()
+
+    def tearDown(self):
+        self.session.close()
+        self.tmp.cleanup()
+
+    def run_case(self, *plan):
+        FakeAutomation.plan = list(plan)
+        self.session.run({}, "case.xml", {})
+
+    def test_browser_error_on_warm_session_is_retried(self):
+        self.run_case(None)
+        self.run_case(PlaywrightError("browser closed"), None)
+
+        self.assertEqual(FakeAutomation.started, 2)
+        self.assertEqual(FakeAutomation.moved, [])
+
+    def test_patient_not_found_fails_without_retry(self):
+        self.run_case(None)
+        with self.assertRaises(PatientNotFoundError):
+            self.run_case(PatientNotFoundError("no match"))
+
+        self.assertEqual(FakeAutomation.started, 1)
+        self.assertEqual(FakeAutomation.moved, ["case.xml"])
+
+    def test_submitted_case_is_not_submitted_twice(self):
+        self.run_case(None)
+        with self.assertRaises(PlaywrightError):
+            self.run_case("submitted")
+
+        self.assertEqual(FakeAutomation.plan, [])
+        self.assertEqual(FakeAutomation.started, 1)
+        self.assertEqual(FakeAutomation.moved, ["case.xml"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import asyncio
+import threading
+from src.ui.coalesce import CoalescedCall
+
+class FakePage:
+    """Runs tasks on a private loop, like ft.Page.run_task."""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.futures = []
+
+    def run_task(self, handler, *args):
+        future = asyncio.run_coroutine_threadsafe(handler(*args), self.loop)
+        self.futures.append(future)
+        return future
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+class TestCoalescedCall(unittest.TestCase):
+    def setUp(self):
+        self.page = FakePage()
+        self.addCleanup(self.page.close)
+
+    def test_burst_runs_callback_once(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def callback():
+            calls.append(1)
+
+        # Hold the loop so the whole burst arrives before the first run
+        async def block():
+            started.set()
+            release.wait(5)
+        self.page.run_task(block)
+        started.wait(5)
+
+        coalesced = CoalescedCall(callback, 0)
+        for _ in range(5):
+            coalesced.request(self.page)
+        release.set()
+        for future in self.page.futures:
+            future.result(timeout=5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(self.page.futures), 2)
+
+    def test_request_after_run_schedules_again(self):
+        calls = []
+        coalesced = CoalescedCall(lambda: calls.append(1), 0)
+
+        coalesced.request(self.page)
+        self.page.futures[-1].result(timeout=5)
+        coalesced.request(self.page)
+        self.page.futures[-1].result(timeout=5)
+
+        self.assertEqual(len(calls), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from watchdog.events import FileCreatedEvent, FileModifiedEvent
+from src import file_watcher
+from src.file_watcher import XMLFileHandler
+
+class FakeTimer:
+    """Records settle timers instead of starting threads; run_timers() fires them."""
+    created = []
+
+    def __init__(self, interval, function, args=()):
+        self.function = function
+        self.args = args
+        self.daemon = False
+        FakeTimer.created.append(self)
+
+    def start(self):
+        pass
+
+def run_timers():
+    timers, FakeTimer.created = FakeTimer.created, []
+    for timer in timers:
+        timer.function(*timer.args)
+    return len(timers)
+
+class TestXMLFileHandler(unittest.TestCase):
+    def make_handler(self, detected):
+        FakeTimer.created = []
+        patcher = mock.patch.object(file_watcher.threading, "Timer", FakeTimer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        handler = XMLFileHandler(detected.append)
+        handler.SETTLE_DELAY = 0  # _settle re-stats immediately
+        return handler
+
+    def test_create_modify_pair_dispatches_once(self):
+        detected = []
+        handler = self.make_handler(detected)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "patient.xml")
+            with open(path, "w") as f:
+                f.write("<NOAH_Patients_Export/>")
+
+            handler.dispatch(FileCreatedEvent(path))
+            handler.dispatch(FileModifiedEvent(path))
+            handler.dispatch(FileCreatedEvent(os.path.join(tmpdir, "notes.txt")))
+            # The pair shares one settle timer; the .txt file gets none
+            self.assertEqual(run_timers(), 1)
+            self.assertEqual(detected, [path])
+
+            # A later event for the unchanged file is not dispatched again
+            handler.dispatch(FileModifiedEvent(path))
+            self.assertEqual(run_timers(), 1)
+
+        self.assertEqual(detected, [path])
+
+    def test_empty_file_waits_for_content(self):
+        detected = []
+        handler = self.make_handler(detected)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "patient.xml")
+            open(path, "w").close()
+            handler.dispatch(FileCreatedEvent(path))
+            self.assertEqual(run_timers(), 1)
+            self.assertEqual(detected, [])
+
+            with open(path, "w") as f:
+                f.write("<NOAH_Patients_Export/>")
+            handler.dispatch(FileModifiedEvent(path))
+            self.assertEqual(run_timers(), 1)
+
+        self.assertEqual(detected, [path])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -39,5 +39,12 @@ class TestParser(unittest.TestCase):
         self.assertEqual(data.get("Tymp_Left_Compliance"), "0.5")
         self.assertEqual(data.get("Tymp_Left_Pressure"), "-10")
 
+    def test_parse_undeclared_prefix(self):
+        # Same export with <zz:FirstName>, a prefix that is never declared
+        sessions = parse_noah_xml("tests/undeclared_prefix.xml")
+
+        self.assertEqual(sessions, parse_noah_xml("tests/real_sample.xml"))
+        self.assertEqual(len(sessions), 1)
+
 if __name__ == "__main__":
     unittest.main()
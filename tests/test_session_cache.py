@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from src import session_cache
+from src.parser import parse_noah_xml, get_available_sessions
+
+class TestSessionCache(unittest.TestCase):
+    def test_cache_round_trip(self):
+        filepath = "tests/real_sample.xml"
+        session_cache.clear_memory_cache()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(session_cache, "CACHE_DIR", cache_dir):
+                first = session_cache.load_sessions(filepath)
+                self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+                # Second load must be served from disk without re-parsing
+                session_cache.clear_memory_cache()
+                with mock.patch.object(session_cache, "parse_noah_xml") as parse:
+                    second = session_cache.load_sessions(filepath)
+                    parse.assert_not_called()
+
+        self.assertEqual(first, second)
+        self.assertEqual(first, parse_noah_xml(filepath))
+
+    def test_memory_cache_skips_disk(self):
+        filepath = "tests/real_sample.xml"
+        session_cache.clear_memory_cache()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(session_cache, "CACHE_DIR", cache_dir):
+                first = session_cache.load_sessions(filepath)
+                with mock.patch.object(session_cache, "_load_from_disk") as load:
+                    second = session_cache.load_sessions(filepath)
+                    load.assert_not_called()
+        session_cache.clear_memory_cache()
+
+        self.assertEqual(first, second)
+
+    def test_sessions_returns_copies(self):
+        filepath = "tests/real_sample.xml"
+        session_cache.clear_memory_cache()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(session_cache, "CACHE_DIR", cache_dir):
+                first = session_cache.load_sessions(filepath)
+                first[0]["Target_Patient_Name"] = "changed"
+                second = session_cache.load_sessions(filepath)
+        session_cache.clear_memory_cache()
+
+        self.assertEqual(second, parse_noah_xml(filepath))
+
+    def test_disk_hit_refreshes_entry(self):
+        filepath = "tests/real_sample.xml"
+        session_cache.clear_memory_cache()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(session_cache, "CACHE_DIR", cache_dir):
+                session_cache.load_sessions(filepath)
+                entry = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+                os.utime(entry, (0, 0))
+
+                session_cache.clear_memory_cache()
+                session_cache.load_sessions(filepath)
+                self.assertGreater(os.path.getmtime(entry), 0)
+        session_cache.clear_memory_cache()
+
+    def test_clear_disk_cache(self):
+        filepath = "tests/real_sample.xml"
+        session_cache.clear_memory_cache()
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(session_cache, "CACHE_DIR", cache_dir):
+                session_cache.load_sessions(filepath)
+                # Only the finished entry is left; the temporary file was renamed
+                self.assertTrue(all(name.endswith(".json") for name in os.listdir(cache_dir)))
+
+                session_cache.clear_disk_cache()
+                self.assertEqual(os.listdir(cache_dir), [])
+
+    def test_available_sessions_returns_copies(self):
+        filepath = "tests/real_sample.xml"
+        session_cache.clear_memory_cache()
+        first = session_cache.load_available_sessions(filepath)
+        first["spreadsheet_id"] = "abc"
+
+        with mock.patch.object(session_cache, "get_available_sessions") as parse:
+            second = session_cache.load_available_sessions(filepath)
+            parse.assert_not_called()
+        session_cache.clear_memory_cache()
+
+        self.assertNotIn("spreadsheet_id", second)
+        self.assertEqual(second, get_available_sessions(filepath))
+
+if __name__ == "__main__":
+    unittest.main()
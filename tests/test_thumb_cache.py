@@ -0,0 +1,63 @@
+import unittest
+import os
+import tempfile
+from unittest import mock
+from src import thumb_cache
+
+@unittest.skipUnless(thumb_cache.PIL_AVAILABLE, "Pillow not installed")
+class TestThumbCache(unittest.TestCase):
+    def test_thumbnail_is_cached(self):
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as tmp:
+            photo = os.path.join(tmp, "ear.jpg")
+            Image.new("RGB", (1600, 1200), "red").save(photo)
+
+            with mock.patch.object(thumb_cache, "THUMB_DIR", os.path.join(tmp, "thumbs")):
+                first = thumb_cache.get_thumbnail(photo)
+                with Image.open(first) as thumb:
+                    self.assertLessEqual(max(thumb.size), max(thumb_cache.THUMB_SIZE))
+
+                # Second call must reuse the file instead of decoding the photo
+                with mock.patch.object(thumb_cache.Image, "open") as open_image:
+                    second = thumb_cache.get_thumbnail(photo)
+                    open_image.assert_not_called()
+
+        self.assertEqual(first, second)
+
+    def test_exif_rotation_is_applied(self):
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as tmp:
+            photo = os.path.join(tmp, "ear.jpg")
+            exif = Image.Exif()
+            exif[0x0112] = 6  # Orientation: rotate 90° clockwise
+            Image.new("RGB", (1600, 800), "red").save(photo, exif=exif)
+
+            with mock.patch.object(thumb_cache, "THUMB_DIR", os.path.join(tmp, "thumbs")):
+                with Image.open(thumb_cache.get_thumbnail(photo)) as thumb:
+                    width, height = thumb.size
+
+        self.assertLess(width, height)
+
+    def test_old_thumbnails_are_pruned(self):
+        from PIL import Image
+        with tempfile.TemporaryDirectory() as tmp:
+            thumb_dir = os.path.join(tmp, "thumbs")
+            with mock.patch.object(thumb_cache, "THUMB_DIR", thumb_dir), \
+                    mock.patch.object(thumb_cache, "MAX_THUMBS", 2):
+                for i in range(3):
+                    photo = os.path.join(tmp, f"ear{i}.jpg")
+                    Image.new("RGB", (64, 64), "red").save(photo)
+                    thumb_cache.get_thumbnail(photo)
+
+                self.assertEqual(len(os.listdir(thumb_dir)), 2)
+
+    def test_unreadable_image_returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bogus = os.path.join(tmp, "ear.jpg")
+            with open(bogus, "w") as f:
+                f.write("not an image")
+            with mock.patch.object(thumb_cache, "THUMB_DIR", os.path.join(tmp, "thumbs")):
+                self.assertIsNone(thumb_cache.get_thumbnail(bogus))
+
+if __name__ == "__main__":
+    unittest.main()